@@ -5,12 +5,14 @@ MP4動画から操作マニュアル（Wordドキュメント）を自動生成
 """
 
 import streamlit as st
+import contextlib
 import copy
+import os
 import json
-import tempfile
+import uuid
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 import cv2
 import numpy as np
 from PIL import Image
@@ -27,24 +29,87 @@ from config import (
     DEFAULT_ANNOTATION_COLOR,
     DEFAULT_STROKE_WIDTH,
     DEFAULT_DRAWING_MODE,
+    ANNOTATION_TYPES,
     ANNOTATION_COLORS,
     MIN_STROKE_WIDTH,
     MAX_STROKE_WIDTH,
     CANVAS_MIN_HEIGHT,
+    EDITOR_CANVAS_HEIGHT,
     SUPPORTED_VIDEO_FORMATS,
     IMAGE_FORMAT_JPEG,
     IMAGE_FORMAT_PNG,
     DEFAULT_IMAGE_FORMAT,
     JPEG_QUALITY,
+    DOC_IMAGE_WIDTH_INCHES,
+    EXPORT_DPI_OPTIONS,
+    DEFAULT_EXPORT_DPI,
+    EXPORT_WORKERS,
+    EXPORT_ENCODE_WORKERS,
+    EXPORT_PIPELINE_DEPTH,
+    RENDER_CACHE_MAX_BYTES,
+    RENDER_CACHE_DIR,
+    RENDER_DISK_CACHE_MAX_BYTES,
+    VIDEO_POOL_MAX_OPEN,
+    VIDEO_POOL_IDLE_TIMEOUT_SEC,
+    FRAME_CACHE_MAX_BYTES,
+    KEYFRAME_INDEX_DIR,
+    TIMESTAMP_SLIDER_STEP,
+    PREFETCH_NEIGHBOR_STEPS,
+    THUMBNAIL_ATLAS_DIR,
+    THUMBNAIL_ATLAS_FPS,
+    THUMBNAIL_ATLAS_HEIGHT,
+    PROXY_VIDEO_DIR,
+    PROXY_VIDEO_HEIGHT,
+    CACHE_DIR,
+    TEMP_SWEEP_TTL_SEC,
+    TEMP_SWEEP_QUOTA_BYTES,
+    TEMP_SWEEP_INTERVAL_SEC,
+    TEMP_SWEEP_CACHE_DIRS,
+    LIVE_SESSION_TTL_SEC,
+    LIVE_SESSION_DIR,
+    SCENE_DETECT_FPS,
+    SCENE_DETECT_HEIGHT,
+    SCENE_DETECT_THRESHOLD,
+    SCENE_DETECT_MIN_INTERVAL_SEC,
+    FRAME_SNAP_WINDOW_SEC,
+    FRAME_SNAP_HEIGHT,
+    REGION_DETECT_BEFORE_SEC,
+    REGION_DETECT_HEIGHT,
+    REGION_DETECT_MAX_REGIONS,
+    STEP_HASH_SIZE,
+    STEP_HASH_MAX_DISTANCE,
+    TIMELINE_STRIP_COUNT,
+    TIMELINE_STRIP_INTERVAL_SEC,
+    UPLOAD_DIR,
+    UPLOAD_QUOTA_BYTES,
     get_initial_session_state,
     get_default_metadata,
     hex_to_bgr,
 )
 
 from utils import (
-    VideoProcessor,
-    TempFileManager,
+    VideoProcessorPool,
+    FramePrefetcher,
+    ThumbnailAtlas,
+    BackgroundJobRunner,
+    UploadStore,
+    RenderCache,
+    DiskCache,
+    make_render_key,
+    compute_content_hash,
+    parse_mp4_video_track,
+    get_proxy_path,
+    open_or_build_proxy,
+    LivePathRegistry,
+    TempSweeper,
+    detect_scene_steps,
+    snap_timestamps,
+    propose_rect_annotations,
+    PerceptualHashIndex,
     DocGenerator,
+    iter_rendered_steps,
+    iter_rendered_steps_parallel,
+    target_width_for_dpi,
     parse_and_validate,
     validate_all_timestamps,
     ValidationResult,
@@ -75,6 +140,12 @@ def init_session_state():
         st.session_state.last_import_result = None
     if "uploaded_json_name" not in st.session_state:
         st.session_state.uploaded_json_name = None
+    if "video_hash" not in st.session_state:
+        st.session_state.video_hash = None
+    if "step_hash_index" not in st.session_state:
+        st.session_state.step_hash_index = PerceptualHashIndex(STEP_HASH_SIZE, STEP_HASH_MAX_DISTANCE)
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
 
 
 def rebuild_steps_by_id():
@@ -96,22 +167,102 @@ def get_next_step_id() -> int:
 # 動画処理
 # =============================================================================
 
+@st.cache_resource
+def get_video_pool() -> VideoProcessorPool:
+    """プロセス内で共有するVideoProcessorプールを取得"""
+    return VideoProcessorPool(
+        max_open=VIDEO_POOL_MAX_OPEN,
+        idle_timeout_sec=VIDEO_POOL_IDLE_TIMEOUT_SEC,
+        frame_cache_bytes=FRAME_CACHE_MAX_BYTES,
+        keyframe_index_dir=KEYFRAME_INDEX_DIR,
+        background_jobs=get_background_jobs(),
+    )
+
+
+@st.cache_resource
+def get_frame_prefetcher() -> FramePrefetcher:
+    """プロセス内で共有するフレーム先読みワーカーを取得"""
+    return FramePrefetcher(get_video_pool())
+
+
+def prefetch_editor_frames(video_path: str, timestamp: float, max_duration: float,
+                           neighbor_timestamps: List[float]):
+    """エディタで次に表示されそうなフレーム（スライダー近傍・前後ステップ）を先読み"""
+    if FRAME_CACHE_MAX_BYTES <= 0:
+        return
+    candidates = []
+    for k in range(1, PREFETCH_NEIGHBOR_STEPS + 1):
+        candidates.append(timestamp + k * TIMESTAMP_SLIDER_STEP)
+        candidates.append(timestamp - k * TIMESTAMP_SLIDER_STEP)
+    candidates.extend(neighbor_timestamps)
+    targets = [t for t in candidates if 0.0 <= t <= max_duration]
+    try:
+        get_frame_prefetcher().request(video_path, targets)
+    except Exception:
+        # 先読みは最適化のみのため、失敗しても表示は継続する
+        pass
+
+
+@st.cache_resource
+def get_live_path_registry() -> LivePathRegistry:
+    """稼働中のセッションが使用しているパスの登録簿を取得（リースファイルで全プロセスと共有）"""
+    return LivePathRegistry(LIVE_SESSION_TTL_SEC, LIVE_SESSION_DIR)
+
+
+@st.cache_resource
+def get_temp_sweeper() -> TempSweeper:
+    """一時ファイル掃除のバックグラウンドスレッドを取得（初回呼び出し時に開始し、すぐに1回実行）"""
+    return TempSweeper(
+        TEMP_SWEEP_INTERVAL_SEC,
+        live_paths_provider=get_live_path_registry().live_paths,
+        cache_dirs=TEMP_SWEEP_CACHE_DIRS,
+        keep_dirs=[CACHE_DIR],
+        ttl_sec=TEMP_SWEEP_TTL_SEC,
+        quota_bytes=TEMP_SWEEP_QUOTA_BYTES,
+    ).start()
+
+
+def register_live_paths():
+    """このセッションが使用中の動画・プロキシ動画・サムネイルアトラスを掃除の対象から外す"""
+    paths = [st.session_state.temp_video_path]
+    video_hash = st.session_state.video_hash
+    if video_hash:
+        paths.append(get_proxy_path(PROXY_VIDEO_DIR, video_hash, PROXY_VIDEO_HEIGHT))
+        paths.extend(ThumbnailAtlas.file_paths(THUMBNAIL_ATLAS_DIR, video_hash))
+    get_live_path_registry().touch(st.session_state.session_id, paths)
+
+
+@st.cache_resource
+def get_upload_store() -> UploadStore:
+    """プロセス内で共有するアップロード動画の保存先を取得（使用中の動画は上限超過時も削除しない）"""
+    return UploadStore(UPLOAD_DIR, UPLOAD_QUOTA_BYTES, live_paths_provider=get_live_path_registry().live_paths)
+
+
 def save_uploaded_video(uploaded_file) -> Optional[str]:
-    """アップロードされた動画を一時ファイルとして保存"""
+    """アップロードされた動画をチャンク単位でコピーして保存（同じ動画は再利用）"""
     try:
         suffix = Path(uploaded_file.name).suffix
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(uploaded_file.getbuffer())
-            return tmp.name
+        video_path, content_hash = get_upload_store().save(uploaded_file, suffix)
+        st.session_state.video_hash = content_hash
+        return video_path
     except Exception as e:
         st.error(f"動画の保存に失敗しました: {e}")
         return None
 
 
 def get_video_info(video_path: str) -> Optional[Dict[str, Any]]:
-    """動画情報を取得"""
+    """動画情報を取得（MP4/MOVはデコーダを開かずにボックスから読む）"""
     try:
-        with VideoProcessor(video_path) as vp:
+        track = parse_mp4_video_track(video_path)
+        if track is not None and track.width > 0 and track.height > 0:
+            info = track.get_video_info()
+            return {
+                "width": info["width"],
+                "height": info["height"],
+                "fps": info["fps"],
+                "duration": info["duration_sec"],
+            }
+        with get_video_pool().lease(video_path) as vp:
             info = vp.get_video_info()
             return {
                 "width": info["width"],
@@ -124,11 +275,15 @@ def get_video_info(video_path: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def extract_frame_as_pil(video_path: str, timestamp: float) -> Optional[Image.Image]:
-    """動画からフレームを抽出してPIL Imageとして返す"""
+def extract_frame_as_pil(video_path: str, timestamp: float,
+                         max_height: Optional[int] = None) -> Optional[Image.Image]:
+    """動画からフレームを抽出してPIL Imageとして返す（max_height指定時は縮小して抽出）"""
     try:
-        with VideoProcessor(video_path) as vp:
-            frame = vp.extract_frame(timestamp)
+        with get_video_pool().lease(video_path) as vp:
+            if max_height is not None:
+                frame = vp.extract_frame_scaled(timestamp, max_height)
+            else:
+                frame = vp.extract_frame(timestamp)
             if frame is not None:
                 # BGR -> RGB変換
                 frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -138,6 +293,223 @@ def extract_frame_as_pil(video_path: str, timestamp: float) -> Optional[Image.Im
     return None
 
 
+@st.cache_resource
+def get_background_jobs() -> BackgroundJobRunner:
+    """プロセス内で共有するバックグラウンドジョブ実行環境を取得（アトラス・シーン検出・キーフレーム）"""
+    return BackgroundJobRunner(max_workers=1)
+
+
+@st.cache_resource
+def get_proxy_jobs() -> BackgroundJobRunner:
+    """
+    プロキシ動画作成専用のバックグラウンドジョブ実行環境を取得
+
+    エディタのプレビューはプロキシ動画を待つため、アトラス作成等の後ろに並ばないよう
+    専用のワーカーで実行する。
+    """
+    return BackgroundJobRunner(max_workers=1)
+
+
+def get_thumbnail_atlas(video_path: str) -> Optional[ThumbnailAtlas]:
+    """
+    動画のサムネイルアトラスを取得（未作成ならバックグラウンドで作成を開始）
+
+    Returns:
+        作成済みのアトラス。作成中の場合はNone。
+    """
+    try:
+        job_key = ("atlas", VideoProcessorPool.make_key(video_path))
+    except OSError:
+        return None
+    jobs = get_background_jobs()
+    atlas = jobs.result(job_key)
+    if atlas is None and not jobs.is_running(job_key):
+        jobs.submit(
+            job_key,
+            ThumbnailAtlas.open_or_build,
+            video_path,
+            THUMBNAIL_ATLAS_DIR,
+            THUMBNAIL_ATLAS_FPS,
+            THUMBNAIL_ATLAS_HEIGHT,
+        )
+    return atlas
+
+
+def get_proxy_video(video_path: str) -> Optional[str]:
+    """
+    エディタプレビュー用のプロキシ動画を取得（未作成ならバックグラウンドで作成を開始）
+
+    Returns:
+        作成済みのプロキシ動画のパス。作成中の場合はNone。
+    """
+    try:
+        job_key = ("proxy", VideoProcessorPool.make_key(video_path))
+    except OSError:
+        return None
+    jobs = get_proxy_jobs()
+    proxy_path = jobs.result(job_key)
+    if proxy_path is None and not jobs.is_running(job_key):
+        jobs.submit(
+            job_key,
+            open_or_build_proxy,
+            video_path,
+            PROXY_VIDEO_DIR,
+            PROXY_VIDEO_HEIGHT,
+        )
+    return proxy_path
+
+
+def get_scene_steps(video_path: str) -> Optional[Dict[str, Any]]:
+    """
+    シーン変化検出によるステップ候補を取得（未実行ならバックグラウンドで検出を開始）
+
+    Returns:
+        Gemini JSONと同じ形式のステップ候補。検出中の場合はNone。
+    """
+    try:
+        job_key = ("scenes", VideoProcessorPool.make_key(video_path))
+    except OSError:
+        return None
+    jobs = get_background_jobs()
+    scene_steps = jobs.result(job_key)
+    if scene_steps is None and not jobs.is_running(job_key):
+        jobs.submit(
+            job_key,
+            detect_scene_steps,
+            video_path,
+            "",
+            SCENE_DETECT_FPS,
+            SCENE_DETECT_HEIGHT,
+            SCENE_DETECT_THRESHOLD,
+            SCENE_DETECT_MIN_INTERVAL_SEC,
+        )
+    return scene_steps
+
+
+def snap_step_timestamps(video_path: str) -> List[Dict[str, Any]]:
+    """
+    全ステップのタイムスタンプを前後で最も安定・鮮明なフレームへ移動
+
+    Returns:
+        移動したステップの {"id", "title", "before", "after", "delta"} のリスト
+    """
+    steps = st.session_state[SESSION_KEYS["steps"]]
+    if not steps:
+        return []
+
+    timestamps = [float(step.get("timestamp", 0)) for step in steps]
+    # 窓内の全フレームを読むため、エディタのプレビュー用のフレームキャッシュは使わない
+    with get_video_pool().lease(video_path, use_frame_cache=False) as vp:
+        snapped = snap_timestamps(vp, timestamps, FRAME_SNAP_WINDOW_SEC, FRAME_SNAP_HEIGHT)
+
+    moved = []
+    for step, before, (after, delta) in zip(steps, timestamps, snapped):
+        if delta == 0:
+            continue
+        step["timestamp"] = after
+        # スライダーの状態を破棄して新しいタイムスタンプを表示させる
+        st.session_state.pop(f"timestamp_slider_{step['id']}", None)
+        moved.append({
+            "id": step["id"],
+            "title": step.get("title", ""),
+            "before": before,
+            "after": after,
+            "delta": delta,
+        })
+    return moved
+
+
+def propose_step_annotations(video_path: str, only_empty: bool = True) -> int:
+    """
+    ステップ前後の変化領域から rect 注釈をまとめて提案して追加
+
+    Args:
+        video_path: 動画ファイルのパス
+        only_empty: Trueの場合、注釈のないステップだけに追加する
+
+    Returns:
+        注釈を追加したステップ数
+    """
+    steps = st.session_state[SESSION_KEYS["steps"]]
+    targets = [step for step in steps if not (only_empty and step.get("annotations"))]
+    if not targets:
+        return 0
+
+    timestamps = [float(step.get("timestamp", 0)) for step in targets]
+    # 全ステップの前後のフレームを読むため、エディタのプレビュー用のフレームキャッシュは使わない
+    with get_video_pool().lease(video_path, use_frame_cache=False) as vp:
+        proposals = propose_rect_annotations(
+            vp,
+            timestamps,
+            REGION_DETECT_BEFORE_SEC,
+            REGION_DETECT_HEIGHT,
+            DEFAULT_ANNOTATION_COLOR,
+            DEFAULT_STROKE_WIDTH,
+            REGION_DETECT_MAX_REGIONS,
+        )
+
+    updated = 0
+    for step, annotations in zip(targets, proposals):
+        if not annotations:
+            continue
+        step["annotations"] = list(step.get("annotations", [])) + annotations
+        # Canvas再初期化フラグをセット（追加した注釈をinitial_drawingに反映）
+        st.session_state[f"canvas_reinit_{step['id']}"] = True
+        updated += 1
+    return updated
+
+
+def get_step_duplicates() -> Dict[int, List[int]]:
+    """
+    ステップのフレームの知覚ハッシュを更新し、重複の可能性があるステップを取得
+
+    タイムスタンプが変わったステップだけハッシュを再計算する。
+    ハッシュは縮小画像で十分なため、全フレームがキーフレームのプロキシ動画からだけ読み、
+    元の動画のデコードで実行を止めたりフレームキャッシュを埋めたりしないようにする
+    （プロキシ動画の作成中は重複なしとして扱う）。
+
+    Returns:
+        ステップID -> 同じ画面の可能性があるステップIDのリスト
+    """
+    video_path = st.session_state.temp_video_path
+    video_hash = st.session_state.video_hash
+    steps = st.session_state[SESSION_KEYS["steps"]]
+    if not video_path or not video_hash or not steps:
+        return {}
+
+    proxy_path = get_proxy_video(video_path)
+    if proxy_path is None:
+        return {}
+    index = st.session_state.step_hash_index
+    try:
+        with get_video_pool().lease(proxy_path) as vp:
+            index.update(
+                vp,
+                [(step["id"], float(step.get("timestamp", 0))) for step in steps],
+                video_key=video_hash,
+            )
+    except Exception:
+        # 重複検出は補助機能のため、失敗しても表示は継続する
+        return {}
+    return index.find_duplicates()
+
+
+def format_duplicate_note(step_id: int, duplicates: Dict[int, List[int]]) -> str:
+    """重複の可能性があるステップの注記を作成（重複がなければ空文字）"""
+    others = duplicates.get(step_id)
+    if not others:
+        return ""
+    return "同じ画面の可能性: " + ", ".join(f"ステップ {other_id}" for other_id in others)
+
+
+def get_thumbnail_as_pil(atlas: ThumbnailAtlas, timestamp: float) -> Optional[Image.Image]:
+    """サムネイルアトラスから指定秒数のサムネイルをPIL Imageとして取得"""
+    thumbnail = atlas.get(timestamp)
+    if thumbnail is None:
+        return None
+    return Image.fromarray(cv2.cvtColor(thumbnail, cv2.COLOR_BGR2RGB))
+
+
 def validate_timestamps_after_upload():
     """動画アップロード後にtimestampを再検証"""
     video_info = st.session_state[SESSION_KEYS["video_info"]]
@@ -284,6 +656,10 @@ def render_sidebar():
                         st.session_state.uploaded_video_name = uploaded_video.name
                         video_info = get_video_info(temp_path)
                         if video_info:
+                            # サムネイルアトラスの作成をバックグラウンドで開始
+                            get_thumbnail_atlas(temp_path)
+                            get_proxy_video(temp_path)
+                            get_scene_steps(temp_path)
                             st.session_state[SESSION_KEYS["video_info"]] = video_info
                             st.session_state[SESSION_KEYS["video_path"]] = uploaded_video.name
                             st.session_state[SESSION_KEYS["preview_mode"]] = False
@@ -308,6 +684,7 @@ def render_sidebar():
             if st.button("動画を削除", type="secondary"):
                 st.session_state.temp_video_path = None
                 st.session_state.uploaded_video_name = None
+                st.session_state.video_hash = None
                 st.session_state[SESSION_KEYS["video_info"]] = None
                 st.session_state[SESSION_KEYS["video_path"]] = ""
                 st.session_state[SESSION_KEYS["preview_mode"]] = True
@@ -384,6 +761,80 @@ def render_tab_ai():
 
     st.divider()
 
+    # シーン変化検出
+    st.subheader("シーン変化検出")
+    st.write("動画の画面の切り替わりからステップ候補を自動で作成します。")
+
+    temp_video_path = st.session_state.temp_video_path
+    if not temp_video_path:
+        st.info("動画をアップロードするとシーン変化検出を利用できます")
+    else:
+        scene_steps = get_scene_steps(temp_video_path)
+        if scene_steps is None:
+            st.caption("シーン変化を検出中です...")
+        else:
+            st.caption(f"{len(scene_steps['steps'])}件のステップ候補が見つかりました")
+        if st.button("検出結果をインポート", key="import_scene_btn",
+                     disabled=scene_steps is None):
+            scene_data = dict(scene_steps)
+            scene_data["project_name"] = st.session_state[SESSION_KEYS["project_name"]]
+            result = import_json_data(json.dumps(scene_data, ensure_ascii=False), is_saved_json=False)
+            st.session_state.last_import_result = result
+            if result.is_valid:
+                st.success(f"インポート成功: {len(result.data.get('steps', []))}件のステップを読み込みました")
+            else:
+                st.error("インポートに失敗しました:")
+                for error in result.errors:
+                    st.write(f"- {error}")
+
+    st.divider()
+
+    # タイムスタンプ補正
+    st.subheader("タイムスタンプ補正")
+    st.write("各ステップのタイムスタンプを、前後で画面が安定していて最も鮮明なフレームへ移動します。")
+
+    steps = st.session_state[SESSION_KEYS["steps"]]
+    snap_disabled = not (temp_video_path and steps)
+    if st.button("全ステップを補正", key="snap_timestamps_btn", disabled=snap_disabled):
+        with st.spinner("フレームを評価中..."):
+            try:
+                moved = snap_step_timestamps(temp_video_path)
+            except Exception as e:
+                st.error(f"タイムスタンプ補正に失敗しました: {e}")
+                moved = None
+        if moved is not None:
+            if moved:
+                st.success(f"{len(moved)}件のステップのタイムスタンプを移動しました")
+                for item in moved:
+                    st.write(
+                        f"- ステップ {item['id']}: {item['title']} "
+                        f"{item['before']:.2f} → {item['after']:.3f} 秒（{item['delta']:+.3f} 秒）"
+                    )
+            else:
+                st.info("移動が必要なステップはありませんでした")
+
+    st.divider()
+
+    # 注釈の自動提案
+    st.subheader("注釈の自動提案")
+    st.write("各ステップの直前と直後のフレームで変化した領域を、矩形の注釈として追加します。")
+
+    only_empty = st.checkbox("注釈のないステップのみ", value=True, key="propose_only_empty")
+    if st.button("注釈を提案", key="propose_annotations_btn", disabled=snap_disabled):
+        with st.spinner("変化領域を検出中..."):
+            try:
+                updated = propose_step_annotations(temp_video_path, only_empty)
+            except Exception as e:
+                st.error(f"注釈の提案に失敗しました: {e}")
+                updated = None
+        if updated is not None:
+            if updated:
+                st.success(f"{updated}件のステップに注釈を追加しました")
+            else:
+                st.info("変化領域が見つかりませんでした")
+
+    st.divider()
+
     # JSONインポート
     st.subheader("JSONインポート")
 
@@ -438,6 +889,25 @@ def render_tab_ai():
 # タブ2: 注釈エディタ
 # =============================================================================
 
+def render_timeline_strip(video_path: str, timestamp: float, max_duration: float):
+    """現在のタイムスタンプ前後のサムネイルを並べて表示"""
+    atlas = get_thumbnail_atlas(video_path)
+    if atlas is None:
+        st.caption("タイムラインを準備中...")
+        return
+
+    half = TIMELINE_STRIP_COUNT // 2
+    columns = st.columns(TIMELINE_STRIP_COUNT)
+    for col, offset in zip(columns, range(-half, TIMELINE_STRIP_COUNT - half)):
+        t = timestamp + offset * TIMELINE_STRIP_INTERVAL_SEC
+        if not (0.0 <= t <= max_duration):
+            continue
+        thumbnail = get_thumbnail_as_pil(atlas, t)
+        if thumbnail is not None:
+            with col:
+                st.image(thumbnail, caption=f"{t:.1f}秒", use_container_width=True)
+
+
 def render_tab_editor():
     """注釈エディタタブをレンダリング"""
     st.header("注釈エディタ")
@@ -465,12 +935,14 @@ def render_tab_editor():
         return
 
     # ステップ選択
+    duplicates = get_step_duplicates()
     step_labels = []
     for step in steps:
         step_id = step["id"]
         is_exceeded = step_id in st.session_state.exceeded_step_ids
         warning_mark = " ⚠️" if is_exceeded else ""
-        step_labels.append(f"ステップ {step_id}: {step.get('title', '無題')}{warning_mark}")
+        duplicate_mark = " 🔁" if step_id in duplicates else ""
+        step_labels.append(f"ステップ {step_id}: {step.get('title', '無題')}{warning_mark}{duplicate_mark}")
 
     # ドラッグ&ドロップ対応ステップ一覧
     st.subheader("ステップ一覧")
@@ -604,7 +1076,7 @@ def render_tab_editor():
             min_value=0.0,
             max_value=max_duration,
             value=safe_value,
-            step=0.1,
+            step=TIMESTAMP_SLIDER_STEP,
             key=f"timestamp_slider_{current_step_id}"
         )
 
@@ -615,6 +1087,10 @@ def render_tab_editor():
             if video_info:
                 validate_timestamps_after_upload()
 
+        # タイムライン（サムネイルアトラスからデコードなしで表示）
+        if not preview_mode and st.session_state.temp_video_path:
+            render_timeline_strip(st.session_state.temp_video_path, timestamp, max_duration)
+
         if preview_mode:
             # プレビューモード: プレースホルダー表示
             st.info("🎬 動画をアップロードするとフレームプレビューが表示されます")
@@ -626,7 +1102,19 @@ def render_tab_editor():
             # 通常モード: フレーム表示 + Canvas
             temp_video_path = st.session_state.temp_video_path
             if temp_video_path:
-                frame_image = extract_frame_as_pil(temp_video_path, timestamp)
+                # プレビューはプロキシ動画から読む（作成中は元の動画）
+                preview_video_path = get_proxy_video(temp_video_path) or temp_video_path
+                frame_image = extract_frame_as_pil(
+                    preview_video_path, timestamp, max_height=EDITOR_CANVAS_HEIGHT
+                )
+
+                # 前後ステップ（◀前へ / 次へ▶）とスライダー近傍を先読み
+                neighbor_timestamps = [
+                    float(steps[i].get("timestamp", 0))
+                    for i in (selected_index - 1, selected_index + 1)
+                    if 0 <= i < len(steps)
+                ]
+                prefetch_editor_frames(preview_video_path, timestamp, max_duration, neighbor_timestamps)
 
                 if frame_image:
                     preview_pending = st.session_state.get("_editor_preview_pending", False)
@@ -644,7 +1132,7 @@ def render_tab_editor():
                         with draw_col1:
                             drawing_mode = st.selectbox(
                                 "描画モード",
-                                ["rect", "line"],
+                                ANNOTATION_TYPES,
                                 index=0,
                                 key=f"drawing_mode_{current_step_id}"
                             )
@@ -675,7 +1163,7 @@ def render_tab_editor():
                             drawing_mode=drawing_mode,
                             stroke_color=stroke_color,
                             stroke_width=stroke_width,
-                            canvas_height=400,
+                            canvas_height=EDITOR_CANVAS_HEIGHT,
                         )
 
                         # 注釈を保存（変更がある場合のみ）
@@ -766,6 +1254,113 @@ def render_tab_editor():
 # タブ3: 生成・エクスポート
 # =============================================================================
 
+def format_annotations_for_render(annotations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """注釈をVideoProcessor.draw_annotationsの形式に変換（rel_coords -> フラット座標）"""
+    formatted_annotations = []
+    for ann in annotations:
+        ann_type = ann.get("type", "rect")
+        rel_coords = ann.get("rel_coords", [])
+        color = hex_to_bgr(ann.get("color", DEFAULT_ANNOTATION_COLOR))
+        thickness = ann.get("stroke_width", DEFAULT_STROKE_WIDTH)
+
+        if ann_type == "rect" and len(rel_coords) == 4:
+            formatted_annotations.append({
+                "type": "rect",
+                "rel_coords": tuple(rel_coords),
+                "color": color,
+                "thickness": thickness,
+            })
+        elif ann_type == "line" and len(rel_coords) == 4:
+            formatted_annotations.append({
+                "type": "line",
+                "rel_coords": tuple(rel_coords),
+                "color": color,
+                "thickness": thickness,
+            })
+        elif ann_type == "polygon" and len(rel_coords) >= 3:
+            formatted_annotations.append({
+                "type": "polygon",
+                "rel_coords": tuple(tuple(point) for point in rel_coords),
+                "color": color,
+                "thickness": thickness,
+            })
+
+    return formatted_annotations
+
+
+@st.cache_resource
+def get_render_cache() -> RenderCache:
+    """プロセス内で共有する描画済みステップ画像キャッシュを取得（ディスクにも永続化）"""
+    return RenderCache(
+        RENDER_CACHE_MAX_BYTES,
+        disk_cache=DiskCache(RENDER_CACHE_DIR, RENDER_DISK_CACHE_MAX_BYTES),
+    )
+
+
+def iter_export_images(video_path: str, render_items: List[Tuple[float, List[Dict[str, Any]]]],
+                       image_format: str, workers: int,
+                       target_width: Optional[int] = None) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """
+    エクスポート用のステップ画像を取得するジェネレータ
+
+    描画キャッシュにあるステップはそのまま返し、動画・フレーム・注釈・
+    出力形式・出力サイズのいずれかが変わったステップだけを抽出・描画・エンコードする。
+    target_width を指定すると、それより大きいフレームは縮小してから注釈を描画する。
+
+    Yields:
+        (render_items内のインデックス, エンコード済み画像) のタプル。
+        フレーム抽出に失敗した場合はNone。
+    """
+    render_cache = get_render_cache()
+    content_hash = st.session_state.video_hash or compute_content_hash(video_path)
+
+    with get_video_pool().lease(video_path) as vp:
+        frame_indices = [vp.frame_index_for_time(timestamp) for timestamp, _ in render_items]
+    keys = [
+        make_render_key(content_hash, frame_index, annotations, image_format, JPEG_QUALITY, target_width)
+        for frame_index, (_, annotations) in zip(frame_indices, render_items)
+    ]
+
+    pending = []
+    for idx, key in enumerate(keys):
+        image_bytes = render_cache.get(key)
+        if image_bytes is None:
+            pending.append(idx)
+        else:
+            yield idx, image_bytes
+    if not pending:
+        return
+
+    pending_items = [render_items[idx] for idx in pending]
+    with contextlib.ExitStack() as stack:
+        if workers > 1:
+            # 複数プロセスで区間ごとに並列デコード
+            results = iter_rendered_steps_parallel(
+                video_path, pending_items,
+                image_format=image_format,
+                jpeg_quality=JPEG_QUALITY,
+                workers=workers,
+                target_width=target_width,
+            )
+        else:
+            vp = stack.enter_context(get_video_pool().lease(video_path))
+            # デコード・描画・エンコードをスレッドで重ねて実行
+            results = iter_rendered_steps(
+                vp, pending_items,
+                image_format=image_format,
+                jpeg_quality=JPEG_QUALITY,
+                encode_workers=EXPORT_ENCODE_WORKERS,
+                pipeline_depth=EXPORT_PIPELINE_DEPTH,
+                target_width=target_width,
+            )
+
+        for i, image_bytes in results:
+            idx = pending[i]
+            if image_bytes is not None:
+                render_cache.put(keys[idx], image_bytes)
+            yield idx, image_bytes
+
+
 def render_tab_export():
     """生成・エクスポートタブをレンダリング"""
     st.header("生成・エクスポート")
@@ -805,12 +1400,26 @@ def render_tab_export():
             for step in skipped_steps:
                 st.write(f"- ステップ {step['id']}: {step.get('title', '無題')}")
 
-    # 出力ステップ一覧
+    # 出力ステップ一覧（サムネイルアトラスが作成済みならサムネイル付き）
+    temp_video_path = st.session_state.temp_video_path
+    atlas = get_thumbnail_atlas(temp_video_path) if temp_video_path else None
+    duplicates = get_step_duplicates()
     with st.expander("出力されるステップ", expanded=True):
         for i, step in enumerate(valid_steps):
-            st.write(f"{i+1}. ステップ {step['id']}: {step.get('title', '無題')}")
-            annotations_count = len(step.get("annotations", []))
-            st.caption(f"   タイムスタンプ: {step.get('timestamp', 0):.2f}秒, 注釈: {annotations_count}件")
+            thumbnail = get_thumbnail_as_pil(atlas, step.get("timestamp", 0)) if atlas else None
+            if thumbnail is not None:
+                thumb_col, text_col = st.columns([1, 5])
+                with thumb_col:
+                    st.image(thumbnail, use_container_width=True)
+            else:
+                text_col = st.container()
+            with text_col:
+                st.write(f"{i+1}. ステップ {step['id']}: {step.get('title', '無題')}")
+                annotations_count = len(step.get("annotations", []))
+                st.caption(f"   タイムスタンプ: {step.get('timestamp', 0):.2f}秒, 注釈: {annotations_count}件")
+                duplicate_note = format_duplicate_note(step["id"], duplicates)
+                if duplicate_note:
+                    st.caption(f"   🔁 {duplicate_note}")
 
     st.divider()
 
@@ -826,6 +1435,26 @@ def render_tab_export():
         key="image_format_radio",
     )
 
+    export_dpi = st.radio(
+        "画像解像度",
+        options=EXPORT_DPI_OPTIONS,
+        format_func=lambda dpi: "原寸" if not dpi else f"{dpi} dpi",
+        index=EXPORT_DPI_OPTIONS.index(DEFAULT_EXPORT_DPI),
+        horizontal=True,
+        key="export_dpi_radio",
+        help=f"文書上の画像幅 {DOC_IMAGE_WIDTH_INCHES:g} インチでの印刷解像度に合わせて縮小します（小さいほどファイルが軽くなります）",
+    )
+
+    export_workers = st.number_input(
+        "並列ワーカー数（1で逐次処理）",
+        min_value=1,
+        max_value=os.cpu_count() or 1,
+        value=min(EXPORT_WORKERS, os.cpu_count() or 1),
+        step=1,
+        key="export_workers_input",
+        help="ステップ数が多い場合、複数プロセスで区間ごとに並列デコードします",
+    )
+
     if st.button("Wordドキュメントを生成", type="primary", key="generate_word_btn"):
         if not valid_steps:
             st.error("出力可能なステップがありません")
@@ -835,105 +1464,88 @@ def render_tab_export():
         status_text = st.empty()
 
         try:
-            with TempFileManager(prefix="m2m_export_") as temp_manager:
-                temp_video_path = st.session_state.temp_video_path
-
-                # 画像生成
-                steps_data = []
-                total_steps = len(valid_steps)
-
-                with VideoProcessor(temp_video_path) as vp:
-                    for i, step in enumerate(valid_steps):
-                        status_text.text(f"ステップ {step['id']} を処理中... ({i+1}/{total_steps})")
-                        progress_bar.progress((i + 1) / (total_steps + 1))
-
-                        # フレーム抽出
-                        timestamp = step.get("timestamp", 0)
-                        frame = vp.extract_frame(timestamp)
-
-                        if frame is None:
-                            st.warning(f"ステップ {step['id']} のフレーム抽出に失敗しました")
-                            continue
-
-                        # 注釈描画
-                        annotations = step.get("annotations", [])
-                        if annotations:
-                            # 注釈形式を変換（rel_coords -> フラット座標）
-                            formatted_annotations = []
-                            for ann in annotations:
-                                ann_type = ann.get("type", "rect")
-                                rel_coords = ann.get("rel_coords", [])
-                                color = hex_to_bgr(ann.get("color", DEFAULT_ANNOTATION_COLOR))
-                                thickness = ann.get("stroke_width", DEFAULT_STROKE_WIDTH)
-
-                                if ann_type == "rect" and len(rel_coords) == 4:
-                                    formatted_annotations.append({
-                                        "type": "rect",
-                                        "rel_coords": tuple(rel_coords),
-                                        "color": color,
-                                        "thickness": thickness,
-                                    })
-                                elif ann_type == "line" and len(rel_coords) == 4:
-                                    formatted_annotations.append({
-                                        "type": "line",
-                                        "rel_coords": tuple(rel_coords),
-                                        "color": color,
-                                        "thickness": thickness,
-                                    })
-                                # polygonは現在VideoProcessorでサポートされていないためスキップ
-
-                            if formatted_annotations:
-                                frame = vp.draw_annotations(frame, formatted_annotations)
-
-                        # 一時ファイルに保存
-                        ext = "png" if image_format == IMAGE_FORMAT_PNG else "jpg"
-                        filename = f"step_{step['id']:03d}.{ext}"
-                        image_path = temp_manager.save_frame(
-                            frame, filename,
-                            image_format=image_format,
-                            jpeg_quality=JPEG_QUALITY,
-                        )
-
-                        steps_data.append({
-                            "id": step["id"],
-                            "title": step.get("title", ""),
-                            "description": step.get("description", ""),
-                            "image_path": str(image_path),
-                        })
-
-                # Word生成
-                status_text.text("Wordドキュメントを生成中...")
-                progress_bar.progress(0.9)
-
-                doc_generator = DocGenerator(project_name)
-                doc_generator.add_title(project_name)
-                doc_generator.add_toc()
-
-                for i, step_data in enumerate(steps_data):
-                    doc_generator.add_step(
-                        step_num=i + 1,
-                        title=step_data["title"],
-                        image_path=step_data["image_path"],
-                        description=step_data["description"],
-                    )
-
-                # バイト列として取得
-                doc_bytes = doc_generator.get_bytes()
-
-                progress_bar.progress(1.0)
-                status_text.text("完了!")
-
-                st.success(f"Wordドキュメントを生成しました（{len(steps_data)}ステップ）")
+            # 画像生成（フレーム番号順にまとめて抽出し、シーク回数を削減）
+            total_steps = len(valid_steps)
+            rendered: Dict[int, Dict[str, Any]] = {}
+            render_items = [
+                (step.get("timestamp", 0), format_annotations_for_render(step.get("annotations", [])))
+                for step in valid_steps
+            ]
+
+            # 描画キャッシュにないステップだけ抽出・描画・エンコード
+            target_width = target_width_for_dpi(export_dpi, DOC_IMAGE_WIDTH_INCHES)
+            with contextlib.closing(iter_export_images(
+                temp_video_path, render_items, image_format, export_workers, target_width,
+            )) as results:
+                for done, (idx, image_bytes) in enumerate(results):
+                    step = valid_steps[idx]
+                    status_text.text(f"ステップ {step['id']} を処理中... ({done+1}/{total_steps})")
+                    progress_bar.progress((done + 1) / (total_steps + 1))
+
+                    if image_bytes is None:
+                        st.warning(f"ステップ {step['id']} のフレーム抽出に失敗しました")
+                        continue
+
+                    rendered[idx] = {
+                        "id": step["id"],
+                        "title": step.get("title", ""),
+                        "description": step.get("description", ""),
+                        "image_bytes": image_bytes,
+                    }
+
+            # ユーザーが指定したステップ順に戻す
+            steps_data = [rendered[idx] for idx in sorted(rendered)]
+            render_cache_stats = get_render_cache().stats()
+
+            # Word生成
+            status_text.text("Wordドキュメントを生成中...")
+            progress_bar.progress(0.9)
+
+            doc_generator = DocGenerator(project_name)
+            doc_generator.add_title(project_name)
+            doc_generator.add_toc()
+
+            for i, step_data in enumerate(steps_data):
+                # エンコード済み画像を一時ファイルを経由せずに埋め込む
+                doc_generator.add_step_bytes(
+                    step_num=i + 1,
+                    title=step_data["title"],
+                    image_data=step_data["image_bytes"],
+                    description=step_data["description"],
+                    max_width=DOC_IMAGE_WIDTH_INCHES,
+                )
 
-                # ダウンロードボタン
-                filename = f"{project_name}.docx"
-                st.download_button(
-                    label="📥 Wordファイルをダウンロード",
-                    data=doc_bytes,
-                    file_name=filename,
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    key="download_docx"
+            # バイト列として取得
+            doc_bytes = doc_generator.get_bytes()
+
+            progress_bar.progress(1.0)
+            status_text.text("完了!")
+
+            st.success(f"Wordドキュメントを生成しました（{len(steps_data)}ステップ）")
+            disk_stats = render_cache_stats.get("disk")
+            st.caption(
+                f"描画キャッシュ: ヒット {render_cache_stats['hits']}件 / "
+                f"ミス {render_cache_stats['misses']}件、"
+                f"{render_cache_stats['entries']}枚 "
+                f"({render_cache_stats['bytes'] / (1024 * 1024):.1f} / "
+                f"{render_cache_stats['max_bytes'] / (1024 * 1024):.0f} MB)"
+                + (
+                    f"、ディスク {disk_stats['entries']}枚 "
+                    f"({disk_stats['bytes'] / (1024 * 1024):.1f} / "
+                    f"{disk_stats['max_bytes'] / (1024 * 1024):.0f} MB)"
+                    if disk_stats else ""
                 )
+            )
+
+            # ダウンロードボタン
+            filename = f"{project_name}.docx"
+            st.download_button(
+                label="📥 Wordファイルをダウンロード",
+                data=doc_bytes,
+                file_name=filename,
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                key="download_docx"
+            )
 
         except Exception as e:
             st.error(f"エラーが発生しました: {e}")
@@ -956,6 +1568,10 @@ def main():
     # Session State初期化
     init_session_state()
 
+    # 使用中の動画を登録してから一時ファイル掃除を開始
+    register_live_paths()
+    get_temp_sweeper()
+
     # サイドバー
     render_sidebar()
 
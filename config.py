@@ -4,6 +4,8 @@
 アプリケーション定数、色定義、フォント設定、デフォルト値を管理する。
 """
 
+import os
+import tempfile
 from typing import Dict, Any
 
 # =============================================================================
@@ -57,7 +59,7 @@ WORD_FONT_SIZE_BODY = 10.5  # 本文フォントサイズ（pt）
 # =============================================================================
 
 # 注釈タイプ
-ANNOTATION_TYPES = ["rect", "line"]
+ANNOTATION_TYPES = ["rect", "line", "polygon"]
 
 # デフォルト線幅
 DEFAULT_STROKE_WIDTH = 3
@@ -73,6 +75,9 @@ MAX_STROKE_WIDTH = 10
 # Canvas最小高さ（Streamlit session_stateクリアバグ回避のため）
 CANVAS_MIN_HEIGHT = 300
 
+# 注釈エディタのCanvas高さ（プレビュー用フレームもこの高さまで縮小して抽出）
+EDITOR_CANVAS_HEIGHT = 400
+
 # デフォルトCanvas描画モード
 DEFAULT_DRAWING_MODE = "rect"
 
@@ -86,6 +91,22 @@ SUPPORTED_VIDEO_FORMATS = [".mp4", ".avi", ".mov", ".mkv"]
 # デフォルトFPS（情報取得失敗時）
 DEFAULT_FPS = 30.0
 
+# VideoProcessorプール: プロセスあたりの最大オープン数（貸出中が上限に達すると返却を待つ）
+VIDEO_POOL_MAX_OPEN = 4
+
+# VideoProcessorプール: アイドル状態のインスタンスを閉じるまでの秒数
+VIDEO_POOL_IDLE_TIMEOUT_SEC = 300.0
+
+# デコード済みフレームキャッシュ: 動画ごとの上限（バイト）。0で無効
+# （4K BGRフレームは1枚約25MB）
+FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# タイムスタンプスライダーの刻み（秒）
+TIMESTAMP_SLIDER_STEP = 0.1
+
+# エディタで先読みする近傍フレーム数（スライダーの刻み単位で前後それぞれ）
+PREFETCH_NEIGHBOR_STEPS = 5
+
 # =============================================================================
 # ファイル設定
 # =============================================================================
@@ -100,9 +121,87 @@ IMAGE_FORMAT_PNG = "png"
 DEFAULT_IMAGE_FORMAT = IMAGE_FORMAT_JPEG
 JPEG_QUALITY = 95  # 0-100（高いほど高画質・大容量）
 
+# Word文書に配置するステップ画像の幅（インチ）
+DOC_IMAGE_WIDTH_INCHES = 5.0
+
+# エクスポート画像の解像度（印刷DPI）の選択肢。0は原寸（縮小しない）
+EXPORT_DPI_OPTIONS = [0, 150, 200, 300]
+DEFAULT_EXPORT_DPI = 200
+
+# エクスポート時のフレーム抽出ワーカープロセス数（1で逐次処理）
+EXPORT_WORKERS = 1
+
+# エクスポート時のエンコードスレッド数（1で逐次処理、2以上でデコード・描画・エンコードを並行実行）
+EXPORT_ENCODE_WORKERS = 2
+
+# エクスポートのパイプラインで各段の間に保持するフレーム数の上限
+EXPORT_PIPELINE_DEPTH = 4
+
+# 描画済みステップ画像（エンコード済み）のメモリ上のキャッシュ上限（バイト）
+RENDER_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
 # 一時ファイルディレクトリ名
 TEMP_DIR_NAME = "temp"
 
+# 永続キャッシュのルートディレクトリ（コンテンツハッシュをキーに再利用）
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "m2m_cache")
+
+# キーフレームインデックス（サイドカー）の保存先
+KEYFRAME_INDEX_DIR = os.path.join(CACHE_DIR, "keyframes")
+
+# アップロード動画の保存先（コンテンツハッシュで重複排除）と合計サイズ上限
+UPLOAD_DIR = os.path.join(CACHE_DIR, "uploads")
+UPLOAD_QUOTA_BYTES = 10 * 1024 * 1024 * 1024
+
+# 描画済みステップ画像（エンコード済み）のディスクキャッシュの保存先と合計サイズ上限
+RENDER_CACHE_DIR = os.path.join(CACHE_DIR, "render")
+RENDER_DISK_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# 最終アクセスからこの時間（秒）が経過したセッションの動画は使用中とみなさない
+LIVE_SESSION_TTL_SEC = 6 * 3600
+
+# 稼働中のセッションが使用しているパスのリースファイルの保存先（全プロセスで共有）
+LIVE_SESSION_DIR = os.path.join(CACHE_DIR, "sessions")
+
+# サムネイルアトラスの保存先・サンプリングレート・高さ（ピクセル）
+THUMBNAIL_ATLAS_DIR = os.path.join(CACHE_DIR, "atlas")
+THUMBNAIL_ATLAS_FPS = 2.0
+THUMBNAIL_ATLAS_HEIGHT = 90
+
+# エディタプレビュー用プロキシ動画（全フレームがキーフレームのMJPEG）の保存先と高さ（ピクセル）
+PROXY_VIDEO_DIR = os.path.join(CACHE_DIR, "proxy")
+PROXY_VIDEO_HEIGHT = EDITOR_CANVAS_HEIGHT
+
+# 一時ファイル掃除: 削除するまでの最終使用からの時間（秒）・対象の合計サイズ上限（バイト）・実行間隔（秒）
+TEMP_SWEEP_TTL_SEC = 7 * 24 * 3600
+TEMP_SWEEP_QUOTA_BYTES = 20 * 1024 * 1024 * 1024
+TEMP_SWEEP_INTERVAL_SEC = 3600
+# 一時ファイル掃除で中のエントリを対象にする保存先（描画キャッシュは DiskCache が上限を管理する）
+TEMP_SWEEP_CACHE_DIRS = [UPLOAD_DIR, PROXY_VIDEO_DIR, THUMBNAIL_ATLAS_DIR, KEYFRAME_INDEX_DIR]
+
+# シーン変化検出のサンプリングレート・解析用の高さ（ピクセル）・しきい値・最小間隔（秒）
+SCENE_DETECT_FPS = 5.0
+SCENE_DETECT_HEIGHT = 90
+SCENE_DETECT_THRESHOLD = 0.05
+SCENE_DETECT_MIN_INTERVAL_SEC = 1.0
+
+# タイムスタンプ補正（安定・鮮明なフレームへの移動）で評価する前後の範囲（秒）と解析用の高さ（ピクセル）
+FRAME_SNAP_WINDOW_SEC = 0.5
+FRAME_SNAP_HEIGHT = 180
+
+# 変化領域検出（rect注釈の自動提案）で比較する直前フレームまでの時間（秒）・解析用の高さ（ピクセル）・1ステップあたりの最大注釈数
+REGION_DETECT_BEFORE_SEC = 0.5
+REGION_DETECT_HEIGHT = 180
+REGION_DETECT_MAX_REGIONS = 3
+
+# 重複ステップ検出の知覚ハッシュ（dHash）の一辺のビット数と、重複とみなすハミング距離の上限
+STEP_HASH_SIZE = 16
+STEP_HASH_MAX_DISTANCE = 3
+
+# エディタのタイムライン（サムネイル列）の枚数と間隔（秒）
+TIMELINE_STRIP_COUNT = 5
+TIMELINE_STRIP_INTERVAL_SEC = 1.0
+
 # =============================================================================
 # デフォルト値
 # =============================================================================
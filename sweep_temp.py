@@ -0,0 +1,12 @@
+"""
+一時ファイル・アップロード動画の掃除スクリプト
+
+アプリを起動していない間やcronから、古い一時ファイルを削除する。
+
+    python sweep_temp.py --dry-run
+"""
+
+from utils.temp_sweeper import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -28,7 +28,8 @@ from config import (
 )
 from utils.coord_utils import (
     pixel_to_relative,
-    relative_to_pixel,
+    rel_coords_to_pixels,
+    polygons_to_pixels,
     validate_rel_coords,
     VALID_ANNOTATION_TYPES,
 )
@@ -77,7 +78,7 @@ def _annotations_equal(
 @dataclass
 class CanvasAnnotation:
     """Canvas上の注釈データ"""
-    type: str  # "rect", "line"
+    type: str  # "rect", "line", "polygon"
     rel_coords: List[float]  # 相対座標
     color: str = DEFAULT_ANNOTATION_COLOR
     stroke_width: int = DEFAULT_STROKE_WIDTH
@@ -257,84 +258,98 @@ class CanvasComponent:
         Returns:
             Fabric.jsオブジェクト辞書 または None
         """
-        ann_type = annotation.type
-        coords = annotation.rel_coords
+        return self._relative_to_fabric_objects([annotation], canvas_width, canvas_height)[0]
 
-        # rect の場合
-        if ann_type == "rect":
-            if len(coords) != 4:
-                return None
-
-            x1, y1 = relative_to_pixel(coords[0], coords[1], canvas_width, canvas_height)
-            x2, y2 = relative_to_pixel(coords[2], coords[3], canvas_width, canvas_height)
-
-            return {
-                "type": "rect",
-                "left": x1,
-                "top": y1,
-                "width": x2 - x1,
-                "height": y2 - y1,
-                "fill": "rgba(0, 0, 0, 0)",  # 透明
-                "stroke": annotation.color,
-                "strokeWidth": annotation.stroke_width,
-                "scaleX": 1,
-                "scaleY": 1,
-            }
-
-        # line の場合
-        elif ann_type == "line":
-            if len(coords) != 4:
-                return None
+    def _relative_to_fabric_objects(
+        self,
+        annotations: List[CanvasAnnotation],
+        canvas_width: int,
+        canvas_height: int,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        複数の相対座標の注釈をまとめてFabric.jsオブジェクトに変換
 
-            x1, y1 = relative_to_pixel(coords[0], coords[1], canvas_width, canvas_height)
-            x2, y2 = relative_to_pixel(coords[2], coords[3], canvas_width, canvas_height)
-
-            # Fabric.js lineオブジェクトの座標計算
-            center_x = (x1 + x2) / 2
-            center_y = (y1 + y2) / 2
-
-            return {
-                "type": "line",
-                "left": center_x,
-                "top": center_y,
-                "x1": x1 - center_x,
-                "y1": y1 - center_y,
-                "x2": x2 - center_x,
-                "y2": y2 - center_y,
-                "originX": "center",
-                "originY": "center",
-                "stroke": annotation.color,
-                "strokeWidth": annotation.stroke_width,
-            }
-
-        # polygon の場合
-        elif ann_type == "polygon":
-            if not isinstance(coords, list) or len(coords) < 3:
-                return None
+        rect/line と polygon の座標をそれぞれ一括でピクセル座標に変換する。
 
-            # pathコマンドを生成
-            path_commands = []
-            for i, point in enumerate(coords):
-                if len(point) != 2:
-                    return None
-                px, py = relative_to_pixel(point[0], point[1], canvas_width, canvas_height)
-                cmd = "M" if i == 0 else "L"
-                path_commands.append([cmd, px, py])
-
-            # パスを閉じる
-            if path_commands:
-                first_point = path_commands[0]
-                path_commands.append(["L", first_point[1], first_point[2]])
-
-            return {
-                "type": "path",
-                "path": path_commands,
-                "stroke": annotation.color,
-                "strokeWidth": annotation.stroke_width,
-                "fill": "rgba(0, 0, 0, 0)",
-            }
+        Args:
+            annotations: CanvasAnnotationのリスト
+            canvas_width: Canvasの幅
+            canvas_height: Canvasの高さ
 
-        return None
+        Returns:
+            引数と同じ順序のFabric.jsオブジェクト辞書（変換できない注釈は None）のリスト
+        """
+        segment_indices = []
+        polygon_indices = []
+        for i, annotation in enumerate(annotations):
+            coords = annotation.rel_coords
+            if annotation.type in ("rect", "line"):
+                if len(coords) == 4:
+                    segment_indices.append(i)
+            elif annotation.type == "polygon":
+                if isinstance(coords, list) and len(coords) >= 3 and all(len(point) == 2 for point in coords):
+                    polygon_indices.append(i)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(annotations)
+
+        if segment_indices:
+            pixel_coords = rel_coords_to_pixels(
+                [annotations[i].rel_coords for i in segment_indices], canvas_width, canvas_height
+            ).tolist()
+            for i, (x1, y1, x2, y2) in zip(segment_indices, pixel_coords):
+                annotation = annotations[i]
+                if annotation.type == "rect":
+                    results[i] = {
+                        "type": "rect",
+                        "left": x1,
+                        "top": y1,
+                        "width": x2 - x1,
+                        "height": y2 - y1,
+                        "fill": "rgba(0, 0, 0, 0)",  # 透明
+                        "stroke": annotation.color,
+                        "strokeWidth": annotation.stroke_width,
+                        "scaleX": 1,
+                        "scaleY": 1,
+                    }
+                else:
+                    # Fabric.js lineオブジェクトの座標計算
+                    center_x = (x1 + x2) / 2
+                    center_y = (y1 + y2) / 2
+                    results[i] = {
+                        "type": "line",
+                        "left": center_x,
+                        "top": center_y,
+                        "x1": x1 - center_x,
+                        "y1": y1 - center_y,
+                        "x2": x2 - center_x,
+                        "y2": y2 - center_y,
+                        "originX": "center",
+                        "originY": "center",
+                        "stroke": annotation.color,
+                        "strokeWidth": annotation.stroke_width,
+                    }
+
+        if polygon_indices:
+            polygon_points = polygons_to_pixels(
+                [annotations[i].rel_coords for i in polygon_indices], canvas_width, canvas_height
+            )
+            for i, points in zip(polygon_indices, polygon_points):
+                annotation = annotations[i]
+                # pathコマンドを生成
+                path_commands = [
+                    ["M" if j == 0 else "L", px, py] for j, (px, py) in enumerate(points.tolist())
+                ]
+                # パスを閉じる
+                path_commands.append(["L", path_commands[0][1], path_commands[0][2]])
+                results[i] = {
+                    "type": "path",
+                    "path": path_commands,
+                    "stroke": annotation.color,
+                    "strokeWidth": annotation.stroke_width,
+                    "fill": "rgba(0, 0, 0, 0)",
+                }
+
+        return results
 
     def create_initial_drawing(
         self,
@@ -353,7 +368,9 @@ class CanvasComponent:
         Returns:
             initial_drawing用の辞書
         """
-        objects = []
+        objects: List[Optional[Dict[str, Any]]] = []
+        pending_positions = []
+        pending_annotations = []
 
         for ann_dict in annotations:
             # 元の Fabric.js オブジェクトがあればそのまま再利用（座標ずれを完全に回避）
@@ -361,11 +378,16 @@ class CanvasComponent:
             if stored_fabric is not None:
                 objects.append(stored_fabric)
             else:
-                # JSON インポート等で _fabric_obj がない場合のみ相対座標から変換
-                annotation = CanvasAnnotation.from_dict(ann_dict)
-                fabric_obj = self._relative_to_fabric(annotation, canvas_width, canvas_height)
-                if fabric_obj:
-                    objects.append(fabric_obj)
+                # JSON インポート等で _fabric_obj がない場合のみ相対座標から変換（後でまとめて変換）
+                pending_positions.append(len(objects))
+                pending_annotations.append(CanvasAnnotation.from_dict(ann_dict))
+                objects.append(None)
+
+        if pending_annotations:
+            fabric_objs = self._relative_to_fabric_objects(pending_annotations, canvas_width, canvas_height)
+            for position, fabric_obj in zip(pending_positions, fabric_objs):
+                objects[position] = fabric_obj
+            objects = [obj for obj in objects if obj]
 
         return {
             "version": "4.4.0",  # Fabric.jsバージョン
@@ -446,7 +468,7 @@ class AnnotationCanvas:
             step_id: 現在のステップID
             steps_by_id: ステップ辞書（ID→ステップデータ）
             preview_mode: プレビューモードフラグ
-            drawing_mode: 描画モード（"rect", "line"）
+            drawing_mode: 描画モード（"rect", "line", "polygon"）
             stroke_color: 線の色
             stroke_width: 線の幅
             canvas_height: Canvasの高さ
@@ -479,8 +501,12 @@ class AnnotationCanvas:
             canvas_height = CANVAS_MIN_HEIGHT
             canvas_width = int(canvas_height * aspect_ratio)
 
-        # 背景画像をリサイズ
-        resized_image = background_image.resize((canvas_width, canvas_height))
+        # 背景画像をリサイズ（Canvasサイズで抽出済みの場合はそのまま使用）
+        if img_height == canvas_height:
+            canvas_width = img_width
+            resized_image = background_image
+        else:
+            resized_image = background_image.resize((canvas_width, canvas_height))
 
         # 現在のステップの注釈を取得
         current_step = steps_by_id.get(step_id, {})
@@ -516,6 +542,7 @@ class AnnotationCanvas:
         mode_mapping = {
             "rect": "rect",
             "line": "line",
+            "polygon": "polygon",
         }
         canvas_mode = mode_mapping.get(drawing_mode, "rect")
 
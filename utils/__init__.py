@@ -11,17 +11,102 @@ from .coord_utils import (
     rect_to_pixel,
     arrow_to_relative,
     arrow_to_pixel,
+    rel_coords_to_pixels,
+    polygons_to_pixels,
     validate_rel_coords,
     VALID_ANNOTATION_TYPES,
 )
 
+from .mp4_parser import (
+    Mp4VideoTrack,
+    parse_mp4_video_track,
+)
+
 from .video_processor import VideoProcessor
 
+from .frame_cache import FrameCache
+
+from .keyframe_index import KeyframeIndex
+
+from .content_hash import compute_content_hash
+
+from .thumbnail_atlas import ThumbnailAtlas
+
+from .proxy_video import (
+    get_proxy_path,
+    open_or_build_proxy,
+    build_proxy,
+)
+
+from .scene_detector import (
+    compute_change_scores,
+    pick_change_points,
+    build_scene_steps,
+    detect_scene_steps,
+)
+
+from .frame_snapper import (
+    make_analysis_image,
+    score_frames,
+    snap_timestamps,
+)
+
+from .region_detector import (
+    detect_changed_regions,
+    propose_rect_annotations,
+)
+
+from .perceptual_hash import (
+    compute_dhash,
+    hamming_distance,
+    PerceptualHashIndex,
+)
+
+from .background_jobs import BackgroundJobRunner
+
+from .upload_store import UploadStore
+
+from .video_pool import VideoProcessorPool
+
+from .frame_prefetcher import FramePrefetcher
+
 from .temp_manager import TempFileManager
 
+from .temp_sweeper import (
+    LivePathRegistry,
+    SweepResult,
+    TempSweeper,
+    sweep_temp_files,
+)
+
+from .image_codec import (
+    get_encode_params,
+    get_image_extension,
+    encode_frame,
+)
+
+from .step_renderer import (
+    iter_rendered_steps,
+    iter_rendered_steps_parallel,
+    partition_by_time,
+    target_width_for_dpi,
+    scale_annotations,
+)
+
+from .disk_cache import (
+    DiskCache,
+)
+
+from .render_cache import (
+    annotation_digest,
+    make_render_key,
+    RenderCache,
+)
+
 from .doc_generator import (
     DocGenerator,
     create_word_manual,
+    create_word_manual_bytes,
     create_word_manual_from_paths,
 )
 
@@ -42,15 +127,78 @@ __all__ = [
     'rect_to_pixel',
     'arrow_to_relative',
     'arrow_to_pixel',
+    'rel_coords_to_pixels',
+    'polygons_to_pixels',
     'validate_rel_coords',
     'VALID_ANNOTATION_TYPES',
+    # mp4_parser
+    'Mp4VideoTrack',
+    'parse_mp4_video_track',
     # video_processor
     'VideoProcessor',
+    # frame_cache
+    'FrameCache',
+    # keyframe_index
+    'KeyframeIndex',
+    # content_hash
+    'compute_content_hash',
+    # thumbnail_atlas
+    'ThumbnailAtlas',
+    # proxy_video
+    'get_proxy_path',
+    'open_or_build_proxy',
+    'build_proxy',
+    # scene_detector
+    'compute_change_scores',
+    'pick_change_points',
+    'build_scene_steps',
+    'detect_scene_steps',
+    # frame_snapper
+    'make_analysis_image',
+    'score_frames',
+    'snap_timestamps',
+    # region_detector
+    'detect_changed_regions',
+    'propose_rect_annotations',
+    # perceptual_hash
+    'compute_dhash',
+    'hamming_distance',
+    'PerceptualHashIndex',
+    # background_jobs
+    'BackgroundJobRunner',
+    # upload_store
+    'UploadStore',
+    # video_pool
+    'VideoProcessorPool',
+    # frame_prefetcher
+    'FramePrefetcher',
     # temp_manager
     'TempFileManager',
+    # temp_sweeper
+    'LivePathRegistry',
+    'SweepResult',
+    'TempSweeper',
+    'sweep_temp_files',
+    # image_codec
+    'get_encode_params',
+    'get_image_extension',
+    'encode_frame',
+    # step_renderer
+    'iter_rendered_steps',
+    'iter_rendered_steps_parallel',
+    'partition_by_time',
+    'target_width_for_dpi',
+    'scale_annotations',
+    # disk_cache
+    'DiskCache',
+    # render_cache
+    'annotation_digest',
+    'make_render_key',
+    'RenderCache',
     # doc_generator
     'DocGenerator',
     'create_word_manual',
+    'create_word_manual_bytes',
     'create_word_manual_from_paths',
     # text_parser
     'ValidationResult',
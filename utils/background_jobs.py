@@ -0,0 +1,97 @@
+"""
+バックグラウンドジョブモジュール
+
+アップロード後のアトラス作成など、画面表示を待たせたくない処理を
+ワーカースレッドで実行する。同じキーのジョブは1回だけ実行する。
+完了したジョブの結果は最近使われた max_finished 件だけ保持する。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobRunner:
+    """キー単位で重複を排除するバックグラウンドジョブ実行クラス"""
+
+    def __init__(self, max_workers: int = 1, max_finished: int = 32):
+        """
+        初期化
+
+        Args:
+            max_workers: ワーカースレッド数
+            max_finished: 保持する完了したジョブの数の上限。超えた分は最後に投入・取得したのが
+                          古いものから破棄し、次の submit() で再実行する。
+        """
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="m2m-bg")
+        # 投入・取得の古い順（LRU順）
+        self._futures: "OrderedDict[Hashable, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        ジョブを投入（同じキーのジョブが投入済みならそれを返す）
+
+        失敗したジョブは再投入できる。
+
+        Args:
+            key: ジョブのキー
+            fn: 実行する関数
+            *args, **kwargs: 関数の引数
+
+        Returns:
+            ジョブのFuture
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                return future
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._futures[key] = future
+            self._futures.move_to_end(key)
+            self._discard_finished()
+            return future
+
+    def result(self, key: Hashable) -> Optional[Any]:
+        """
+        完了したジョブの結果を待たずに取得
+
+        Args:
+            key: ジョブのキー
+
+        Returns:
+            ジョブの戻り値。未投入・実行中・失敗の場合はNone。
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self._futures.move_to_end(key)
+        if future is None or not future.done():
+            return None
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"Background job {key!r} failed: {error}")
+            return None
+        return future.result()
+
+    def _discard_finished(self):
+        """完了したジョブが max_finished 件を超えていれば古いものから破棄（ロック内で呼ぶ）"""
+        finished = [key for key, future in self._futures.items() if future.done()]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._futures[key]
+
+    def is_running(self, key: Hashable) -> bool:
+        """ジョブが実行待ち・実行中ならTrue"""
+        with self._lock:
+            future = self._futures.get(key)
+        return future is not None and not future.done()
+
+    def shutdown(self):
+        """実行待ちのジョブを取り消してワーカーを停止"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,69 @@
+"""
+コンテンツハッシュモジュール
+
+動画ファイルの内容からキャッシュ用のハッシュ値を計算する。
+"""
+
+import hashlib
+import os
+import threading
+from typing import Dict, Tuple
+
+
+# 読み込みチャンクサイズ（バイト）
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+_memo: Dict[Tuple[str, int, int], str] = {}
+_memo_lock = threading.Lock()
+
+
+def _stat_key(path: str) -> Tuple[str, int, int]:
+    """ファイルの(絶対パス, 更新時刻[ns], サイズ)を取得"""
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    return (abs_path, stat.st_mtime_ns, stat.st_size)
+
+
+def compute_content_hash(path: str) -> str:
+    """
+    ファイル内容のSHA-256ハッシュを計算
+
+    同じプロセス内では(パス, 更新時刻, サイズ)が変わらない限り再計算しない。
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        16進数のハッシュ文字列
+    """
+    key = _stat_key(path)
+    with _memo_lock:
+        cached = _memo.get(key)
+    if cached is not None:
+        return cached
+
+    hasher = hashlib.sha256()
+    with open(key[0], "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    with _memo_lock:
+        _memo[key] = digest
+    return digest
+
+
+def remember_content_hash(path: str, digest: str):
+    """
+    計算済みのハッシュを登録（アップロード時に計算した値の再利用用）
+
+    Args:
+        path: ファイルのパス
+        digest: ファイル内容のSHA-256ハッシュ（16進数）
+    """
+    key = _stat_key(path)
+    with _memo_lock:
+        _memo[key] = digest
@@ -5,7 +5,9 @@ Canvasのピクセル座標と動画の相対座標（0.0-1.0）の変換を行
 バリデーション機能も提供する。
 """
 
-from typing import Tuple, List, Union
+from typing import Tuple, List, Sequence, Union
+
+import numpy as np
 
 
 # 許容される注釈タイプ
@@ -170,6 +172,89 @@ def arrow_to_pixel(rel_coords: Tuple[float, float, float, float], video_width: i
     return (x1, y1, x2, y2)
 
 
+def _to_pixel_array(points: np.ndarray, scale: np.ndarray, rounding: str) -> np.ndarray:
+    """相対座標の配列に幅・高さを掛け、丸めて int32 に変換"""
+    pixels = points * scale
+    if rounding == "round":
+        # np.rint は Python の round() と同じ偶数丸め
+        return np.rint(pixels).astype(np.int32)
+    if rounding == "trunc":
+        # int() と同じ0方向への切り捨て
+        return pixels.astype(np.int32)
+    raise ValueError(f"rounding must be 'round' or 'trunc', got {rounding!r}")
+
+
+def _check_batch_args(points: np.ndarray, width: int, height: int, check_range: bool):
+    """バッチ変換の引数チェック"""
+    if width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive values")
+    if check_range and points.size and not ((points >= 0.0) & (points <= 1.0)).all():
+        raise ValueError("Relative coordinates must be between 0.0 and 1.0")
+
+
+def rel_coords_to_pixels(rel_coords: Union[Sequence[Sequence[float]], np.ndarray], width: int, height: int,
+                         rounding: str = "round", check_range: bool = True) -> np.ndarray:
+    """
+    複数の矩形・線・矢印の相対座標をまとめてピクセル座標へ変換
+
+    rect_to_pixel / arrow_to_pixel をN件分まとめて計算する。
+
+    Args:
+        rel_coords: (N, 4) の相対座標 [[rx1, ry1, rx2, ry2], ...]
+        width: キャンバスまたは動画の幅（ピクセル）
+        height: キャンバスまたは動画の高さ（ピクセル）
+        rounding: "round"（四捨五入、rect_to_pixel と同じ）または
+                  "trunc"（切り捨て、VideoProcessor.draw_rect 等と同じ）
+        check_range: Trueの場合、0.0-1.0の範囲外の値で ValueError を送出する
+
+    Returns:
+        (N, 4) の int32 配列 [[x1, y1, x2, y2], ...]
+
+    Example:
+        >>> rel_coords_to_pixels([[0.1, 0.1, 0.2, 0.2]], 1000, 500).tolist()
+        [[100, 50, 200, 100]]
+    """
+    points = np.asarray(rel_coords, dtype=np.float64)
+    if points.size == 0:
+        return np.empty((0, 4), dtype=np.int32)
+    if points.ndim != 2 or points.shape[1] != 4:
+        raise ValueError("rel_coords must be an (N, 4) array of floats")
+    _check_batch_args(points, width, height, check_range)
+    scale = np.array([width, height, width, height], dtype=np.float64)
+    return _to_pixel_array(points, scale, rounding)
+
+
+def polygons_to_pixels(polygons: Sequence[Sequence[Sequence[float]]], width: int, height: int,
+                       rounding: str = "round", check_range: bool = True) -> List[np.ndarray]:
+    """
+    点数の異なる複数の多角形の相対座標をまとめてピクセル座標へ変換
+
+    全多角形の点を1つの配列に連結して一度に変換し、元の多角形ごとに分割して返す。
+
+    Args:
+        polygons: 多角形のリスト。各多角形は相対座標の点列 [[rx, ry], ...]
+        width: キャンバスまたは動画の幅（ピクセル）
+        height: キャンバスまたは動画の高さ（ピクセル）
+        rounding: "round"（四捨五入）または "trunc"（切り捨て）
+        check_range: Trueの場合、0.0-1.0の範囲外の値で ValueError を送出する
+
+    Returns:
+        多角形ごとの (点数, 2) の int32 配列のリスト（cv2.polylines にそのまま渡せる）
+
+    Example:
+        >>> [p.tolist() for p in polygons_to_pixels([[[0.1, 0.1], [0.2, 0.1], [0.2, 0.2]]], 1000, 500)]
+        [[[100, 50], [200, 50], [200, 100]]]
+    """
+    if len(polygons) == 0:
+        return []
+    arrays = [np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in polygons]
+    points = np.concatenate(arrays)
+    _check_batch_args(points, width, height, check_range)
+    pixels = _to_pixel_array(points, np.array([width, height], dtype=np.float64), rounding)
+    offsets = np.cumsum([len(array) for array in arrays])[:-1]
+    return np.split(pixels, offsets)
+
+
 def _is_valid_relative_value(value: float) -> bool:
     """相対座標値が0.0-1.0の範囲内かチェック"""
     return isinstance(value, (int, float)) and 0.0 <= value <= 1.0
@@ -0,0 +1,284 @@
+"""
+ディスクキャッシュモジュール
+
+コンテンツハッシュ等のキーをファイル名にしてバイト列を永続キャッシュに保存する。
+合計サイズが上限を超えた場合はアクセス時刻の古いファイルから削除する。
+書き込みは一時ファイル + rename で行うため、複数のStreamlitワーカープロセスが
+同じディレクトリを共有しても書き込み途中のファイルを読むことはない。
+"""
+
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 書き込み途中のファイルのプレフィックス
+_PARTIAL_PREFIX = ".cache-"
+
+# この時間（秒）より古い書き込み途中のファイルは中断されたものとみなして削除する
+_STALE_PARTIAL_SEC = 3600
+
+# キーに使える文字（ファイル名としてそのまま使うため16進文字のみ）
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{16,128}$")
+
+
+class DiskCache:
+    """
+    キーをファイル名にしたサイズ上限付きの永続キャッシュ
+
+    ファイルはキーの先頭2文字のサブディレクトリに保存する。
+    スレッドセーフで、複数プロセスからの同時アクセスにも対応する。
+    """
+
+    def __init__(self, root_dir: str, max_bytes: int, suffix: str = ""):
+        """
+        初期化
+
+        Args:
+            root_dir: キャッシュディレクトリ
+            max_bytes: キャッシュディレクトリの合計サイズ上限（バイト）
+            suffix: 保存するファイルの拡張子（例: ".jpg"）
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be a non-negative value")
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        # 前回の上限チェック以降に書き込んだバイト数（Noneは未チェック）
+        self._written_since_check: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key: str) -> str:
+        """
+        キーに対応するファイルのパスを取得（ファイルの有無は問わない）
+
+        Args:
+            key: 16進文字列のキー（SHA-256ダイジェスト等）
+
+        Returns:
+            ファイルのパス
+        """
+        if not _KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid cache key: {key!r}")
+        return os.path.join(self.root_dir, key[:2], f"{key}{self.suffix}")
+
+    def _touch(self, path: str):
+        """アクセス時刻を更新（relatime等のマウントでもLRUの順序を保つため明示的に更新）"""
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        データを取得
+
+        Args:
+            key: キー
+
+        Returns:
+            保存されたバイト列。なければNone。
+        """
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._touch(path)
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def get_path(self, key: str) -> Optional[str]:
+        """
+        保存済みファイルのパスを取得（ファイルとして扱う利用者向け）
+
+        Args:
+            key: キー
+
+        Returns:
+            ファイルのパス。なければNone。
+        """
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._touch(path)
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def __contains__(self, key: str) -> bool:
+        """ヒット/ミスを数えずに存在確認"""
+        return os.path.exists(self.path_for(key))
+
+    def put(self, key: str, data: bytes) -> Optional[str]:
+        """
+        データを保存
+
+        一時ファイルに書き込んでから rename する。同じキーは同じ内容を指すため、
+        別のプロセスと同時に書き込んでも後勝ちで問題ない。1件で上限を超えるデータは保存しない。
+
+        Args:
+            key: キー
+            data: 保存するバイト列
+
+        Returns:
+            保存したファイルのパス。保存しなかった場合はNone。
+        """
+        if len(data) > self.max_bytes:
+            return None
+
+        path = self.path_for(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=_PARTIAL_PREFIX, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        # 毎回ディレクトリを走査しないよう、上限の1/8を書き込むごとにチェックする
+        with self._lock:
+            if self._written_since_check is None:
+                should_check = True
+            else:
+                self._written_since_check += len(data)
+                should_check = self._written_since_check > self.max_bytes // 8
+            if should_check:
+                self._written_since_check = 0
+        if should_check:
+            self.enforce_quota(keep=[path])
+        return path
+
+    def _iter_files(self) -> Iterable[os.DirEntry]:
+        """キャッシュディレクトリ内のファイルを列挙"""
+        try:
+            shards = list(os.scandir(self.root_dir))
+        except FileNotFoundError:
+            return
+        for shard in shards:
+            if not shard.is_dir(follow_symlinks=False):
+                continue
+            try:
+                entries = list(os.scandir(shard.path))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry
+
+    def enforce_quota(self, keep: Iterable[str] = ()) -> int:
+        """
+        合計サイズが上限を超えていれば、アクセス時刻の古いファイルから削除
+
+        中断された書き込み途中のファイルも削除する。
+
+        Args:
+            keep: 削除しないファイルのパス
+
+        Returns:
+            削除したバイト数
+        """
+        keep_paths = {os.path.abspath(p) for p in keep}
+        now = time.time()
+        entries = []
+        total = 0
+        reclaimed = 0
+
+        for entry in self._iter_files():
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if entry.name.startswith(_PARTIAL_PREFIX):
+                if now - stat.st_mtime > _STALE_PARTIAL_SEC:
+                    try:
+                        os.unlink(entry.path)
+                        reclaimed += stat.st_size
+                    except OSError:
+                        pass
+                continue
+            total += stat.st_size
+            path = os.path.abspath(entry.path)
+            if path not in keep_paths:
+                entries.append((stat.st_atime, stat.st_size, path))
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to remove cache file {path}: {e}")
+                continue
+            total -= size
+            reclaimed += size
+
+        return reclaimed
+
+    def clear(self) -> int:
+        """
+        キャッシュのファイルをすべて削除（統計はリセットしない）
+
+        Returns:
+            削除したバイト数
+        """
+        reclaimed = 0
+        for entry in self._iter_files():
+            try:
+                size = entry.stat(follow_symlinks=False).st_size
+                os.unlink(entry.path)
+            except OSError:
+                continue
+            reclaimed += size
+        return reclaimed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        統計情報を取得
+
+        Returns:
+            {'hits': ヒット数, 'misses': ミス数, 'entries': ファイル数,
+             'bytes': 使用バイト数, 'max_bytes': 上限バイト数}
+        """
+        entries = 0
+        total = 0
+        for entry in self._iter_files():
+            if entry.name.startswith(_PARTIAL_PREFIX):
+                continue
+            try:
+                total += entry.stat(follow_symlinks=False).st_size
+            except FileNotFoundError:
+                continue
+            entries += 1
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': entries,
+                'bytes': total,
+                'max_bytes': self.max_bytes,
+            }
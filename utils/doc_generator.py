@@ -9,7 +9,7 @@ from docx.shared import Inches, Pt, RGBColor, Cm
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
-from typing import List, Dict, Optional
+from typing import BinaryIO, List, Dict, Optional, Union
 from pathlib import Path
 import io
 import logging
@@ -198,6 +198,28 @@ class DocGenerator:
         header_text = f"ステップ{step_num}: {title}"
         self.doc.add_heading(header_text, level=2)
 
+    def _add_image_placeholder(self, text: str, color: RGBColor):
+        """画像の代わりにプレースホルダーテキストを追加（中央揃え）"""
+        placeholder_para = self.doc.add_paragraph()
+        placeholder_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        placeholder_run = placeholder_para.add_run(text)
+        placeholder_run.font.italic = True
+        placeholder_run.font.color.rgb = color
+
+    def _add_picture(self, image: Union[str, BinaryIO], max_width: float):
+        """画像を中央揃えの段落として追加（失敗時は例外を送出）"""
+        # 画像を中央揃えで追加
+        img_para = self.doc.add_paragraph()
+        img_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        # 画像を追加（幅を指定）
+        run = img_para.add_run()
+        run.add_picture(image, width=Inches(max_width))
+
+        # 画像周りのスペース
+        img_para.paragraph_format.space_before = Pt(6)
+        img_para.paragraph_format.space_after = Pt(6)
+
     def add_step_image(self, image_path: str, max_width: float = 5.0):
         """ステップの画像を追加（中央揃え）
 
@@ -210,34 +232,35 @@ class DocGenerator:
         if not img_path.exists():
             logger.warning(f"Image file not found: {image_path}")
             # 画像がない場合はプレースホルダーテキストを追加
-            placeholder_para = self.doc.add_paragraph()
-            placeholder_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            placeholder_run = placeholder_para.add_run(f"[画像: {img_path.name}]")
-            placeholder_run.font.italic = True
-            placeholder_run.font.color.rgb = RGBColor(150, 150, 150)
+            self._add_image_placeholder(f"[画像: {img_path.name}]", RGBColor(150, 150, 150))
             return
 
         try:
-            # 画像を中央揃えで追加
-            img_para = self.doc.add_paragraph()
-            img_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            self._add_picture(str(img_path.absolute()), max_width)
+        except Exception as e:
+            logger.error(f"Error adding image {image_path}: {e}")
+            # エラー時はプレースホルダーを追加
+            self._add_image_placeholder(f"[画像読み込みエラー: {img_path.name}]", RGBColor(200, 50, 50))
 
-            # 画像を追加（幅を指定）
-            run = img_para.add_run()
-            run.add_picture(str(img_path.absolute()), width=Inches(max_width))
+    def add_step_image_bytes(self, image_data: Union[bytes, BinaryIO], max_width: float = 5.0,
+                             name: str = "image"):
+        """エンコード済みの画像データからステップの画像を追加（中央揃え）
 
-            # 画像周りのスペース
-            img_para.paragraph_format.space_before = Pt(6)
-            img_para.paragraph_format.space_after = Pt(6)
+        cv2.imencode 等の結果を一時ファイルに書き出さずにそのまま埋め込む。
 
+        Args:
+            image_data: エンコード済み画像（JPEG/PNGのバイト列またはファイルライクオブジェクト）
+            max_width: 画像の最大幅（インチ）、デフォルト5インチ（約12.7cm）
+            name: エラー時のプレースホルダーに表示する画像名
+        """
+        stream = io.BytesIO(image_data) if isinstance(image_data, (bytes, bytearray, memoryview)) else image_data
+
+        try:
+            self._add_picture(stream, max_width)
         except Exception as e:
-            logger.error(f"Error adding image {image_path}: {e}")
+            logger.error(f"Error adding image {name}: {e}")
             # エラー時はプレースホルダーを追加
-            placeholder_para = self.doc.add_paragraph()
-            placeholder_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            placeholder_run = placeholder_para.add_run(f"[画像読み込みエラー: {img_path.name}]")
-            placeholder_run.font.italic = True
-            placeholder_run.font.color.rgb = RGBColor(200, 50, 50)
+            self._add_image_placeholder(f"[画像読み込みエラー: {name}]", RGBColor(200, 50, 50))
 
     def add_step_description(self, description: str):
         """ステップの説明文を追加
@@ -268,6 +291,21 @@ class DocGenerator:
         self.add_step_image(image_path)
         self.add_step_description(description)
 
+    def add_step_bytes(self, step_num: int, title: str, image_data: Union[bytes, BinaryIO], description: str,
+                       max_width: float = 5.0):
+        """エンコード済みの画像データを使って1ステップ分のコンテンツを追加
+
+        Args:
+            step_num: ステップ番号
+            title: ステップのタイトル
+            image_data: エンコード済み画像（JPEG/PNGのバイト列またはファイルライクオブジェクト）
+            description: 説明文
+            max_width: 画像の最大幅（インチ）
+        """
+        self.add_step_header(step_num, title)
+        self.add_step_image_bytes(image_data, max_width=max_width, name=f"ステップ{step_num}")
+        self.add_step_description(description)
+
     def save(self, output_path: str):
         """ドキュメントを保存
 
@@ -318,6 +356,29 @@ class DocGenerator:
         section_para.paragraph_format.space_after = Pt(12)
 
 
+def _build_manual(steps_data: List[Dict], project_name: str) -> DocGenerator:
+    """ステップデータからマニュアルのDocGeneratorを作成
+
+    各ステップは "image_bytes"（エンコード済み画像）があればそれを、
+    なければ "image_path" の画像ファイルを使う。
+    """
+    gen = DocGenerator(project_name)
+    gen.add_title(project_name)
+
+    for step in steps_data:
+        step_num = step.get("id", step.get("step_num", 0))
+        title = step.get("title", "")
+        description = step.get("description", "")
+
+        image_bytes = step.get("image_bytes")
+        if image_bytes is not None:
+            gen.add_step_bytes(step_num, title, image_bytes, description)
+        else:
+            gen.add_step(step_num, title, step.get("image_path", ""), description)
+
+    return gen
+
+
 def create_word_manual(steps_data: List[Dict], output_path: str,
                        project_name: str = "操作マニュアル") -> str:
     """マニュアルWordファイルを作成する便利関数
@@ -328,7 +389,7 @@ def create_word_manual(steps_data: List[Dict], output_path: str,
                 "id": 1,
                 "title": "メニューを開く",
                 "description": "「インストールされているアプリ」をクリックします。",
-                "image_path": "path/to/image.jpg"
+                "image_path": "path/to/image.jpg"  # または "image_bytes": エンコード済み画像
             }, ...]
         output_path: 出力ファイルパス
         project_name: プロジェクト名（ドキュメントタイトル）
@@ -336,18 +397,29 @@ def create_word_manual(steps_data: List[Dict], output_path: str,
     Returns:
         出力ファイルの絶対パス
     """
-    gen = DocGenerator(project_name)
-    gen.add_title(project_name)
+    return _build_manual(steps_data, project_name).save(output_path)
 
-    for step in steps_data:
-        step_num = step.get("id", step.get("step_num", 0))
-        title = step.get("title", "")
-        image_path = step.get("image_path", "")
-        description = step.get("description", "")
 
-        gen.add_step(step_num, title, image_path, description)
+def create_word_manual_bytes(steps_data: List[Dict],
+                             project_name: str = "操作マニュアル") -> bytes:
+    """エンコード済み画像からマニュアルWordファイルをメモリ上で作成する便利関数
+
+    画像・ドキュメントともにファイルを経由しない。
 
-    return gen.save(output_path)
+    Args:
+        steps_data: ステップデータのリスト
+            [{
+                "id": 1,
+                "title": "メニューを開く",
+                "description": "「インストールされているアプリ」をクリックします。",
+                "image_bytes": b"..."  # cv2.imencode 等でエンコードしたJPEG/PNG
+            }, ...]
+        project_name: プロジェクト名（ドキュメントタイトル）
+
+    Returns:
+        ドキュメントのバイト列
+    """
+    return _build_manual(steps_data, project_name).get_bytes()
 
 
 def create_word_manual_from_paths(image_paths: List[str], descriptions: List[str],
@@ -0,0 +1,122 @@
+"""
+デコード済みフレームキャッシュモジュール
+
+フレーム番号をキーに、デコード済みフレームをメモリ上限（バイト数）付きの
+LRUで保持する。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class FrameCache:
+    """
+    バイト数上限付きのフレームLRUキャッシュ
+
+    4K BGRフレームは1枚約25MBになるため、上限はエントリ数ではなく
+    バイト数で指定する。格納したフレームは読み取り専用になるため、
+    取り出したフレームに描画する場合はコピーすること。
+    スレッドセーフ。
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        初期化
+
+        Args:
+            max_bytes: キャッシュの最大サイズ（バイト）
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be a non-negative value")
+        self.max_bytes = max_bytes
+        self._frames: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame_index: int) -> Optional[np.ndarray]:
+        """
+        フレームを取得
+
+        Args:
+            frame_index: フレーム番号
+
+        Returns:
+            キャッシュされたフレーム（読み取り専用）。なければNone。
+        """
+        with self._lock:
+            frame = self._frames.get(frame_index)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(frame_index)
+            self.hits += 1
+            return frame
+
+    def put(self, frame_index: int, frame: np.ndarray) -> np.ndarray:
+        """
+        フレームを格納
+
+        上限を超える場合は古いフレームから破棄する。
+        1枚で上限を超えるフレームは格納しない。
+
+        Args:
+            frame_index: フレーム番号
+            frame: フレーム画像（numpy配列）
+
+        Returns:
+            格納したフレーム（読み取り専用）。格納しなかった場合は引数のまま。
+        """
+        if frame.nbytes > self.max_bytes:
+            return frame
+        frame.flags.writeable = False
+
+        with self._lock:
+            old = self._frames.pop(frame_index, None)
+            if old is not None:
+                self._current_bytes -= old.nbytes
+
+            self._frames[frame_index] = frame
+            self._current_bytes += frame.nbytes
+
+            while self._current_bytes > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self._current_bytes -= evicted.nbytes
+
+        return frame
+
+    def __contains__(self, frame_index: int) -> bool:
+        """ヒット/ミスを数えずに存在確認"""
+        with self._lock:
+            return frame_index in self._frames
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._frames)
+
+    def clear(self):
+        """キャッシュを空にする（統計はリセットしない）"""
+        with self._lock:
+            self._frames.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        統計情報を取得
+
+        Returns:
+            {'hits': ヒット数, 'misses': ミス数, 'entries': 格納フレーム数,
+             'bytes': 使用バイト数, 'max_bytes': 上限バイト数}
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._frames),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,98 @@
+"""
+フレーム先読みモジュール
+
+エディタで表示中のフレームの近傍を、バックグラウンドスレッドで
+デコードしてFrameCacheに格納する。
+"""
+
+import logging
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from .video_pool import VideoProcessorPool
+
+logger = logging.getLogger(__name__)
+
+
+class FramePrefetcher:
+    """
+    バックグラウンドでフレームを先読みするクラス
+
+    要求ごとにプールからVideoProcessorを借りて（最大オープン数に数える）、
+    プールのFrameCacheに書き込む。貸し出しは排他的なため、前面の抽出処理と
+    キャプチャを共有しない。新しい要求が来ると、処理中の古い要求は
+    残りのフレームを破棄して打ち切る。
+    """
+
+    def __init__(self, pool: VideoProcessorPool):
+        """
+        初期化
+
+        Args:
+            pool: FrameCacheを共有するVideoProcessorプール
+                  （frame_cache_bytes > 0 で作成されていること）
+        """
+        self.pool = pool
+        self._condition = threading.Condition()
+        self._pending: Optional[Tuple[str, List[float]]] = None
+        self._generation = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="frame-prefetcher", daemon=True)
+        self._thread.start()
+
+    def request(self, video_path: str, timestamps: Iterable[float]):
+        """
+        先読みを要求（直前の未完了の要求は置き換える）
+
+        Args:
+            video_path: 動画ファイルのパス
+            timestamps: 先読みするフレームの時間（秒）のリスト
+        """
+        with self._condition:
+            self._pending = (video_path, list(timestamps))
+            self._generation += 1
+            self._condition.notify()
+
+    def close(self):
+        """ワーカースレッドを停止"""
+        with self._condition:
+            self._closed = True
+            self._generation += 1
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+        """ワーカースレッドのメインループ"""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    break
+                video_path, timestamps = self._pending
+                self._pending = None
+                generation = self._generation
+
+            try:
+                self._prefetch(video_path, timestamps, generation)
+            except Exception as e:
+                logger.warning(f"Frame prefetch failed for {video_path}: {e}")
+
+    def _prefetch(self, video_path: str, timestamps: List[float], generation: int):
+        """要求されたフレームをデコードしてキャッシュに格納"""
+        if self.pool.frame_cache_for(video_path) is None:
+            return
+
+        with self.pool.lease(video_path) as processor:
+            frame_indices = [
+                processor.frame_index_for_time(t) for t in timestamps
+            ]
+            missing = [
+                i for i in frame_indices
+                if 0 <= i < processor.total_frames and i not in processor.frame_cache
+            ]
+
+            # extract系はキャッシュ格納まで行うため、結果は捨ててよい
+            for _ in processor.iter_frame_indices(missing):
+                if generation != self._generation:
+                    break
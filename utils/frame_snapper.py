@@ -0,0 +1,156 @@
+"""
+フレームスナップモジュール
+
+LLMが出力したタイムスタンプは画面の切り替わり途中や動きでぶれたフレームに
+当たることがある。各ステップのタイムスタンプ前後の数フレームを評価し、
+動きが少なく最も鮮明なフレームへタイムスタンプを移動する。
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .video_processor import VideoProcessor
+
+
+# 最も動きの少ないフレームから、この差分（平均絶対差分、0〜255）以内を安定とみなす
+STABLE_MOTION_TOLERANCE = 1.0
+
+# 隣接フレームとの差分がこれを超える位置は画面の切り替わりとみなし、窓をまたがない
+CUT_MOTION_THRESHOLD = 20.0
+
+# 元のフレームが安定している場合、鮮明度がこの比率以上改善しなければ移動しない
+MIN_SHARPNESS_GAIN = 1.05
+
+
+def make_analysis_image(frame: np.ndarray, analysis_height: int) -> np.ndarray:
+    """
+    評価用に縮小したグレースケール画像を作成
+
+    Args:
+        frame: フレーム画像（BGR）
+        analysis_height: 縮小後の高さ（元の高さ以下の場合は縮小しない）
+
+    Returns:
+        グレースケール画像
+    """
+    height, width = frame.shape[:2]
+    if height > analysis_height:
+        scaled_width = max(1, round(width * analysis_height / height))
+        frame = cv2.resize(frame, (scaled_width, analysis_height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def score_frames(vp: VideoProcessor, frame_indices: Sequence[int],
+                 analysis_height: int = 180) -> Tuple[Dict[int, float], Dict[int, float]]:
+    """
+    フレームごとの鮮明度と直前フレームとの差分を計算
+
+    フレーム番号順に1回だけ読み進め、評価用の縮小画像は直前の1枚だけ保持する。
+
+    Args:
+        vp: VideoProcessor
+        frame_indices: 評価するフレーム番号のリスト
+        analysis_height: 評価用に縮小する高さ（ピクセル）
+
+    Returns:
+        (フレーム番号 -> ラプラシアンの分散, フレーム番号 -> 直前フレームとの平均絶対差分)
+        のタプル。直前フレームが評価対象でない場合、差分は含まない。
+    """
+    unique_indices = sorted(set(i for i in frame_indices if i >= 0))
+    sharpness: Dict[int, float] = {}
+    motion: Dict[int, float] = {}
+
+    prev_index: Optional[int] = None
+    prev_gray: Optional[np.ndarray] = None
+    for i, frame in vp.iter_frame_indices(unique_indices):
+        if frame is None:
+            continue
+        frame_index = unique_indices[i]
+        gray = make_analysis_image(frame, analysis_height)
+        sharpness[frame_index] = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        if prev_index == frame_index - 1 and prev_gray is not None:
+            motion[frame_index] = float(cv2.absdiff(gray, prev_gray).mean())
+        prev_index, prev_gray = frame_index, gray
+
+    return sharpness, motion
+
+
+def _pick_best_frame(center: int, window: range, sharpness: Dict[int, float],
+                     motion: Dict[int, float]) -> int:
+    """窓内で動きが少なく最も鮮明なフレーム番号を選ぶ（同点なら中心に近い方）"""
+    if center not in sharpness:
+        return center
+
+    # 中心から画面の切り替わりをまたがない範囲に候補を限定する
+    start = center
+    while start - 1 in window and start - 1 in sharpness and motion.get(start, 0.0) <= CUT_MOTION_THRESHOLD:
+        start -= 1
+    end = center
+    while end + 1 in window and end + 1 in sharpness and motion.get(end + 1, 0.0) <= CUT_MOTION_THRESHOLD:
+        end += 1
+    candidates = range(start, end + 1)
+
+    def frame_motion(i: int) -> float:
+        # 前後両方のフレームとの差分が大きいフレームは遷移途中・ぶれとみなす
+        values = [motion[j] for j in (i, i + 1) if j in motion]
+        return min(values) if values else 0.0
+
+    motions = {i: frame_motion(i) for i in candidates}
+    min_motion = min(motions.values())
+    stable = [i for i in candidates if motions[i] <= min_motion + STABLE_MOTION_TOLERANCE]
+    best = max(stable, key=lambda i: (sharpness[i], -abs(i - center)))
+    if center in stable and sharpness[best] < sharpness[center] * MIN_SHARPNESS_GAIN:
+        return center
+    return best
+
+
+def snap_timestamps(vp: VideoProcessor, timestamps: Sequence[float],
+                    window_sec: float = 0.5, analysis_height: int = 180) -> List[Tuple[float, float]]:
+    """
+    各タイムスタンプを前後の窓内で最も安定・鮮明なフレームへ移動
+
+    全ステップの窓をまとめてフレーム番号順に1回だけ読み進めるため、
+    候補フレームごとにシークしない。
+
+    Args:
+        vp: VideoProcessor
+        timestamps: タイムスタンプ（秒）のリスト
+        window_sec: タイムスタンプの前後に評価する範囲（秒）
+        analysis_height: 評価用に縮小する高さ（ピクセル）
+
+    Returns:
+        引数と同じ順序の (移動後のタイムスタンプ, 移動量（秒）) のリスト。
+        移動しない場合は元のタイムスタンプと0を返す。
+    """
+    radius = max(1, int(round(window_sec * vp.fps)))
+    last_frame = vp.total_frames - 1
+
+    windows = []
+    needed = set()
+    for timestamp in timestamps:
+        center = min(vp.frame_index_for_time(timestamp), last_frame)
+        if center < 0:
+            # 動画の範囲外は移動しない
+            windows.append((center, range(0)))
+            continue
+        window = range(max(0, center - radius), min(last_frame, center + radius) + 1)
+        windows.append((center, window))
+        # 窓の前後1フレームも読み、端のフレームの差分を計算できるようにする
+        needed.update(range(max(0, window.start - 1), min(last_frame, window.stop) + 1))
+
+    sharpness, motion = score_frames(vp, sorted(needed), analysis_height)
+
+    results = []
+    for timestamp, (center, window) in zip(timestamps, windows):
+        if center < 0:
+            results.append((timestamp, 0.0))
+            continue
+        best = _pick_best_frame(center, window, sharpness, motion)
+        if best == center:
+            results.append((timestamp, 0.0))
+            continue
+        snapped = round(vp.time_for_frame_index(best), 3)
+        results.append((snapped, round(snapped - timestamp, 3)))
+    return results
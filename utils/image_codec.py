@@ -0,0 +1,60 @@
+"""
+画像エンコードモジュール
+
+エクスポート用フレームのJPEG/PNGエンコード設定を一元管理する。
+"""
+
+from typing import List
+
+import cv2
+import numpy as np
+
+
+def get_encode_params(image_format: str = "jpeg", jpeg_quality: int = 95) -> List[int]:
+    """
+    OpenCVのエンコードパラメータを取得
+
+    Args:
+        image_format: 画像フォーマット（"jpeg" or "png"）
+        jpeg_quality: JPEG品質（0-100、image_format="jpeg"の場合のみ有効）
+
+    Returns:
+        cv2.imwrite / cv2.imencode に渡すパラメータリスト
+    """
+    if image_format == "png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, 3]
+    return [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+
+
+def get_image_extension(image_format: str = "jpeg") -> str:
+    """
+    画像フォーマットの拡張子を取得
+
+    Args:
+        image_format: 画像フォーマット（"jpeg" or "png"）
+
+    Returns:
+        "png" または "jpg"
+    """
+    return "png" if image_format == "png" else "jpg"
+
+
+def encode_frame(frame: np.ndarray, image_format: str = "jpeg", jpeg_quality: int = 95) -> bytes:
+    """
+    フレームを画像ファイルのバイト列にエンコード
+
+    同じパラメータの cv2.imwrite と同一のバイト列になる。
+
+    Args:
+        frame: フレーム画像（numpy配列）
+        image_format: 画像フォーマット（"jpeg" or "png"）
+        jpeg_quality: JPEG品質（0-100、image_format="jpeg"の場合のみ有効）
+
+    Returns:
+        エンコードされた画像のバイト列
+    """
+    ext = get_image_extension(image_format)
+    ok, buffer = cv2.imencode(f".{ext}", frame, get_encode_params(image_format, jpeg_quality))
+    if not ok:
+        raise ValueError(f"フレームを {image_format} にエンコードできません。")
+    return buffer.tobytes()
@@ -0,0 +1,226 @@
+"""
+キーフレームインデックスモジュール
+
+動画のキーフレーム（GOP先頭）位置を調べ、コンテンツハッシュをキーとした
+サイドカーJSONとして保存する。VideoProcessorはこれを使って
+シークとgrab()による読み進めのどちらが速いかを判断する。
+"""
+
+import bisect
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from .content_hash import compute_content_hash
+from .mp4_parser import parse_mp4_video_track
+
+logger = logging.getLogger(__name__)
+
+# サイドカーのフォーマットバージョン
+# （2: MP4/MOVはstssから表示順のフレーム番号で作成、
+#   3: stssのキーフレームをOpenCVのフレーム番号（時刻 × 平均fps）に変換、
+#   4: VideoProcessorのフレーム番号に合わせて再びstssの表示順のサンプル番号で作成）
+KEYFRAME_INDEX_VERSION = 4
+
+
+class KeyframeIndex:
+    """キーフレーム位置のインデックス"""
+
+    # シーク自体の固定コスト（デコーダのフラッシュ等）をフレーム数換算した値
+    SEEK_OVERHEAD_FRAMES = 4
+
+    def __init__(self, keyframes: List[int], total_frames: int):
+        """
+        初期化
+
+        Args:
+            keyframes: キーフレームのフレーム番号リスト
+            total_frames: 総フレーム数
+        """
+        self.keyframes = sorted(set(keyframes))
+        self.total_frames = total_frames
+        if not self.keyframes or self.keyframes[0] != 0:
+            # 先頭フレームは常にデコード開始点として扱う
+            self.keyframes.insert(0, 0)
+
+    @classmethod
+    def build(cls, video_path: str) -> Optional["KeyframeIndex"]:
+        """
+        動画をデコードせずにインデックスを作成
+
+        MP4/MOVの場合はstssボックス（同期サンプル表）から表示順の
+        キーフレーム番号を直接読む。それ以外の形式では、
+        OpenCVのFFmpegバックエンドのrawモード（CAP_PROP_FORMAT=-1）で
+        パケットを読み、CAP_PROP_LRF_HAS_KEY_FRAMEでキーフレームを判定する。
+        パケットはデコード順のため、Bフレームを含む動画では
+        表示順のフレーム番号と多少ずれることがある。
+
+        Args:
+            video_path: 動画ファイルのパス
+
+        Returns:
+            KeyframeIndex。バックエンドが未対応の場合はNone。
+        """
+        track = parse_mp4_video_track(video_path)
+        if track is not None:
+            return cls(track.keyframes, track.frame_count)
+
+        if not hasattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME"):
+            return None
+
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        if not cap.isOpened():
+            return None
+
+        try:
+            keyframes = []
+            frame_index = 0
+            while cap.grab():
+                if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                    keyframes.append(frame_index)
+                frame_index += 1
+        finally:
+            cap.release()
+
+        if frame_index == 0:
+            return None
+        return cls(keyframes, frame_index)
+
+    @classmethod
+    def load_or_build(cls, video_path: str, index_dir: str,
+                      content_hash: Optional[str] = None) -> Optional["KeyframeIndex"]:
+        """
+        サイドカーがあれば読み込み、なければ作成して保存
+
+        Args:
+            video_path: 動画ファイルのパス
+            index_dir: サイドカーの保存ディレクトリ
+            content_hash: 動画のコンテンツハッシュ（省略時は計算）
+
+        Returns:
+            KeyframeIndex。作成できなかった場合はNone。
+        """
+        if content_hash is None:
+            content_hash = compute_content_hash(video_path)
+        sidecar_path = os.path.join(index_dir, f"{content_hash}.json")
+
+        if os.path.exists(sidecar_path):
+            try:
+                return cls.load(sidecar_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Broken keyframe index {sidecar_path}: {e}")
+
+        index = cls.build(video_path)
+        if index is not None:
+            try:
+                index.save(sidecar_path)
+            except OSError as e:
+                logger.warning(f"Failed to save keyframe index {sidecar_path}: {e}")
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> "KeyframeIndex":
+        """
+        サイドカーJSONから読み込み
+
+        Args:
+            path: サイドカーファイルのパス
+
+        Returns:
+            KeyframeIndex
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != KEYFRAME_INDEX_VERSION:
+            raise ValueError(f"Unsupported keyframe index version: {data.get('version')}")
+        return cls(data["keyframes"], data["total_frames"])
+
+    def save(self, path: str):
+        """
+        サイドカーJSONとして保存（一時ファイル経由で置き換え）
+
+        Args:
+            path: サイドカーファイルのパス
+        """
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def to_dict(self) -> Dict:
+        """辞書形式に変換"""
+        return {
+            "version": KEYFRAME_INDEX_VERSION,
+            "total_frames": self.total_frames,
+            "keyframes": self.keyframes,
+        }
+
+    def keyframe_at_or_before(self, frame_index: int) -> int:
+        """
+        指定フレーム以前で最も近いキーフレームを取得
+
+        Args:
+            frame_index: フレーム番号
+
+        Returns:
+            キーフレームのフレーム番号
+        """
+        pos = bisect.bisect_right(self.keyframes, frame_index) - 1
+        return self.keyframes[max(pos, 0)]
+
+    def gop_range(self, frame_index: int) -> Tuple[int, int]:
+        """
+        指定フレームを含むGOPの範囲を取得
+
+        Args:
+            frame_index: フレーム番号
+
+        Returns:
+            (GOP先頭のフレーム番号, 次のGOP先頭のフレーム番号) のタプル
+        """
+        pos = max(bisect.bisect_right(self.keyframes, frame_index) - 1, 0)
+        start = self.keyframes[pos]
+        end = self.keyframes[pos + 1] if pos + 1 < len(self.keyframes) else self.total_frames
+        return (start, end)
+
+    def gop_sizes(self) -> List[int]:
+        """
+        各GOPのフレーム数を取得
+
+        Returns:
+            GOPごとのフレーム数リスト
+        """
+        bounds = self.keyframes + [self.total_frames]
+        return [bounds[i + 1] - bounds[i] for i in range(len(self.keyframes))]
+
+    def decode_cost(self, position: Optional[int], target_frame: int) -> Tuple[bool, int]:
+        """
+        現在位置から目標フレームまでの読み込み方法とデコード枚数を見積もる
+
+        Args:
+            position: 次に読まれるフレーム番号（不明な場合はNone）
+            target_frame: 目標のフレーム番号
+
+        Returns:
+            (シークすべきか, デコードが必要なフレーム数) のタプル
+        """
+        keyframe = self.keyframe_at_or_before(target_frame)
+        seek_cost = target_frame - keyframe + 1
+        if position is None or target_frame < position:
+            return (True, seek_cost)
+        grab_cost = target_frame - position + 1
+        # 現在位置より後にキーフレームがなければ、シークしても同じ区間をデコードするだけ
+        if keyframe <= position or grab_cost <= seek_cost + self.SEEK_OVERHEAD_FRAMES:
+            return (False, grab_cost)
+        return (True, seek_cost)
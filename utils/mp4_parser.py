@@ -0,0 +1,287 @@
+"""
+MP4/MOVボックス解析モジュール
+
+デコードせずに moov/trak/mdia/minf/stbl（stts, ctts, stss, stsz, stsd）を読み、
+映像トラックの正確なフレーム時刻とキーフレーム位置を取得する。
+可変フレームレートの画面録画でも、OpenCVの推定値
+（CAP_PROP_FRAME_COUNT / CAP_PROP_FPS）に頼らずにフレーム番号を決められる。
+"""
+
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# 子ボックスを持つコンテナボックス
+_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts"}
+
+# moovとして読み込むサイズの上限（破損ファイル対策）
+_MAX_MOOV_SIZE = 256 * 1024 * 1024
+
+
+class Mp4VideoTrack:
+    """
+    映像トラックのサンプル情報
+
+    frame_times はフレーム番号（表示順）ごとの表示時刻（秒）、
+    keyframes はキーフレームのフレーム番号（表示順）。
+    """
+
+    def __init__(self, width: int, height: int, timescale: int,
+                 frame_times: np.ndarray, keyframes: List[int], duration_sec: float):
+        """
+        初期化
+
+        Args:
+            width: 幅（ピクセル）
+            height: 高さ（ピクセル）
+            timescale: メディアのタイムスケール（1秒あたりの単位数）
+            frame_times: 表示順のフレーム時刻（秒）の昇順配列
+            keyframes: キーフレームのフレーム番号リスト（表示順）
+            duration_sec: トラックの長さ（秒）
+        """
+        self.width = width
+        self.height = height
+        self.timescale = timescale
+        self.frame_times = frame_times
+        self.keyframes = keyframes
+        self.duration_sec = duration_sec
+
+    @property
+    def frame_count(self) -> int:
+        """総フレーム数"""
+        return len(self.frame_times)
+
+    @property
+    def fps(self) -> float:
+        """平均フレームレート"""
+        if self.duration_sec <= 0:
+            return 0.0
+        return self.frame_count / self.duration_sec
+
+    def frame_index_for_time(self, time_sec: float) -> int:
+        """
+        時間（秒）を表示中のフレーム番号に変換（二分探索）
+
+        Args:
+            time_sec: 時間（秒）
+
+        Returns:
+            time_sec の時点で表示されているフレーム番号。
+            負の時間やトラックの長さ以降の時間の場合は-1。
+        """
+        if time_sec < 0 or time_sec >= self.duration_sec or self.frame_count == 0:
+            return -1
+        # 浮動小数点の丸め誤差でフレーム境界の直前に落ちないよう許容誤差を加える
+        index = int(np.searchsorted(self.frame_times, time_sec + 1e-6, side="right")) - 1
+        return min(max(index, 0), self.frame_count - 1)
+
+    def get_video_info(self) -> Dict:
+        """
+        VideoProcessor.get_video_info と同じ形式の動画情報を取得
+
+        Returns:
+            {'width', 'height', 'fps', 'total_frames', 'duration_sec'} の辞書
+        """
+        return {
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'total_frames': self.frame_count,
+            'duration_sec': self.duration_sec,
+        }
+
+
+def _iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """メモリ上のボックス列を走査し (type, payload開始位置, ボックス終了位置) を返す"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _find_box(data: bytes, path: List[bytes], start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """ボックスのパス（例: [b"mdia", b"mdhd"]）をたどって (payload開始, 終了) を返す"""
+    for box_type, payload, box_end in _iter_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload, box_end
+            if box_type in _CONTAINER_BOXES:
+                found = _find_box(data, path[1:], payload, box_end)
+                if found is not None:
+                    return found
+    return None
+
+
+def _read_moov(f: BinaryIO) -> Optional[bytes]:
+    """ファイルのトップレベルを走査し、moovボックスの中身を読み込む（mdatは読み飛ばす）"""
+    f.seek(0, 2)
+    file_size = f.tell()
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack_from(">I4s", header, 0)
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                return None
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size:
+            return None
+
+        if box_type == b"moov":
+            payload_size = size - header_size
+            if payload_size > _MAX_MOOV_SIZE:
+                return None
+            f.seek(pos + header_size)
+            return f.read(payload_size)
+        if pos == 0 and box_type != b"ftyp":
+            # MP4/MOVではない
+            return None
+        pos += size
+    return None
+
+
+def _parse_full_box_entries(data: bytes, payload: int, fmt: str) -> Tuple[int, np.ndarray]:
+    """(version, entries) を返す。entries は (entry_count, len(fmt)) の配列"""
+    version = data[payload]
+    count = struct.unpack_from(">I", data, payload + 4)[0]
+    width = len(fmt)
+    dtype = ">i4" if (fmt == "Ii" and version == 1) else ">u4"
+    entries = np.frombuffer(data, dtype=">u4", count=count * width, offset=payload + 8)
+    if dtype == ">i4":
+        entries = entries.view(">i4")
+    return version, entries.reshape(count, width).astype(np.int64)
+
+
+def _parse_video_trak(data: bytes, start: int, end: int) -> Optional[Mp4VideoTrack]:
+    """trakボックスが映像トラックならサンプル情報を解析"""
+    hdlr = _find_box(data, [b"mdia", b"hdlr"], start, end)
+    if hdlr is None or data[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+        return None
+
+    mdhd = _find_box(data, [b"mdia", b"mdhd"], start, end)
+    if mdhd is None:
+        return None
+    if data[mdhd[0]] == 1:
+        timescale = struct.unpack_from(">I", data, mdhd[0] + 20)[0]
+    else:
+        timescale = struct.unpack_from(">I", data, mdhd[0] + 12)[0]
+    if timescale == 0:
+        return None
+
+    stbl_path = [b"mdia", b"minf", b"stbl"]
+    stts = _find_box(data, stbl_path + [b"stts"], start, end)
+    stsz = _find_box(data, stbl_path + [b"stsz"], start, end)
+    stsd = _find_box(data, stbl_path + [b"stsd"], start, end)
+    if stts is None or stsz is None:
+        return None
+
+    # stsz: サンプル数
+    sample_count = struct.unpack_from(">I", data, stsz[0] + 8)[0]
+    if sample_count == 0:
+        return None
+
+    # stts: デコード時刻
+    _, stts_entries = _parse_full_box_entries(data, stts[0], "II")
+    deltas = np.repeat(stts_entries[:, 1], stts_entries[:, 0])[:sample_count]
+    if len(deltas) < sample_count:
+        return None
+    dts = np.concatenate(([0], np.cumsum(deltas)[:-1]))
+
+    # ctts: 表示時刻のオフセット（Bフレーム）
+    pts = dts.copy()
+    ctts = _find_box(data, stbl_path + [b"ctts"], start, end)
+    if ctts is not None:
+        _, ctts_entries = _parse_full_box_entries(data, ctts[0], "Ii")
+        offsets = np.repeat(ctts_entries[:, 1], ctts_entries[:, 0])[:sample_count]
+        pts[:len(offsets)] += offsets
+
+    # elst: 先頭の編集区間のmedia_timeだけ表示時刻をずらす
+    elst = _find_box(data, [b"edts", b"elst"], start, end)
+    if elst is not None:
+        version = data[elst[0]]
+        entry_count = struct.unpack_from(">I", data, elst[0] + 4)[0]
+        offset = elst[0] + 8
+        for _ in range(entry_count):
+            if version == 1:
+                media_time = struct.unpack_from(">q", data, offset + 8)[0]
+                offset += 20
+            else:
+                media_time = struct.unpack_from(">i", data, offset + 4)[0]
+                offset += 12
+            if media_time >= 0:
+                pts -= media_time
+                break
+
+    # 表示順に並べ替え
+    order = np.argsort(pts, kind="stable")
+    frame_times = pts[order] / timescale
+    frame_times -= frame_times[0]
+
+    # stss: キーフレーム（デコード順のサンプル番号、1始まり）。なければ全フレームがキーフレーム
+    stss = _find_box(data, stbl_path + [b"stss"], start, end)
+    if stss is not None:
+        _, stss_entries = _parse_full_box_entries(data, stss[0], "I")
+        key_samples = stss_entries[:, 0] - 1
+        key_samples = key_samples[(key_samples >= 0) & (key_samples < sample_count)]
+        presentation_index = np.empty(sample_count, dtype=np.int64)
+        presentation_index[order] = np.arange(sample_count)
+        keyframes = sorted(int(i) for i in presentation_index[key_samples])
+    else:
+        keyframes = list(range(sample_count))
+
+    # stsd: 先頭のVisualSampleEntryの幅・高さ
+    width = height = 0
+    if stsd is not None and struct.unpack_from(">I", data, stsd[0] + 4)[0] > 0:
+        entry = stsd[0] + 8
+        width, height = struct.unpack_from(">HH", data, entry + 8 + 24)
+
+    duration_sec = float(np.sum(deltas)) / timescale
+    if duration_sec <= 0:
+        return None
+    return Mp4VideoTrack(width, height, timescale, frame_times, keyframes, duration_sec)
+
+
+def parse_mp4_video_track(video_path: str) -> Optional[Mp4VideoTrack]:
+    """
+    MP4/MOVファイルの最初の映像トラックを解析
+
+    Args:
+        video_path: 動画ファイルのパス
+
+    Returns:
+        Mp4VideoTrack。MP4/MOVでない場合や解析できない場合はNone。
+    """
+    try:
+        with open(video_path, "rb") as f:
+            moov = _read_moov(f)
+        if moov is None:
+            return None
+        for box_type, payload, box_end in _iter_boxes(moov):
+            if box_type == b"trak":
+                track = _parse_video_trak(moov, payload, box_end)
+                if track is not None:
+                    return track
+    except (OSError, struct.error, ValueError, IndexError):
+        return None
+    return None
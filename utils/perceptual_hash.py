@@ -0,0 +1,142 @@
+"""
+知覚ハッシュモジュール
+
+ステップのフレームごとに差分ハッシュ（dHash）を計算して保持し、
+ハミング距離が近いステップ（同じ画面を指す重複ステップ）を検出する。
+タイムスタンプが変わったステップだけを再計算する。
+"""
+
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .video_processor import VideoProcessor
+
+
+def compute_dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """
+    フレームの差分ハッシュ（dHash）を計算
+
+    (hash_size + 1) x hash_size のグレースケール画像に縮小し、
+    横に隣り合う画素の大小関係をビット列にする。
+
+    Args:
+        frame: フレーム画像（BGR）
+        hash_size: ハッシュの一辺のビット数（hash_size ** 2 ビットのハッシュ）
+
+    Returns:
+        ハッシュ値（整数）
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """
+    2つのハッシュのハミング距離
+
+    Args:
+        hash_a: ハッシュ値
+        hash_b: ハッシュ値
+
+    Returns:
+        異なるビットの数
+    """
+    return bin(hash_a ^ hash_b).count("1")
+
+
+class PerceptualHashIndex:
+    """
+    ステップのフレームの知覚ハッシュのインデックス
+
+    ステップIDごとに (フレーム番号, ハッシュ) を保持し、
+    update() ではフレーム番号が変わったステップだけを再計算する。
+    """
+
+    def __init__(self, hash_size: int = 16, max_distance: int = 3):
+        """
+        初期化
+
+        Args:
+            hash_size: dHashの一辺のビット数（画面の一部だけが変わるUI録画では
+                       8x8より細かい方が別の画面として区別しやすい）
+            max_distance: 重複とみなすハミング距離の上限（hash_size ** 2 ビット中）
+        """
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self._video_key: Optional[Hashable] = None
+        self._entries: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, vp: VideoProcessor, steps: Sequence[Tuple[Hashable, float]],
+               video_key: Optional[Hashable] = None) -> int:
+        """
+        ステップのハッシュを更新（変更・追加されたステップのみ計算）
+
+        Args:
+            vp: VideoProcessor
+            steps: (ステップID, タイムスタンプ（秒）) のリスト
+            video_key: 動画を識別するキー。前回と異なる場合はインデックスを作り直す。
+
+        Returns:
+            ハッシュを計算したステップ数
+        """
+        if video_key != self._video_key:
+            self._entries.clear()
+            self._video_key = video_key
+
+        current_ids = set()
+        pending: List[Tuple[Hashable, int]] = []
+        for step_id, timestamp in steps:
+            current_ids.add(step_id)
+            frame_index = vp.frame_index_for_time(timestamp)
+            entry = self._entries.get(step_id)
+            if entry is None or entry[0] != frame_index:
+                pending.append((step_id, frame_index))
+
+        # 削除されたステップを除く
+        for step_id in list(self._entries):
+            if step_id not in current_ids:
+                del self._entries[step_id]
+
+        for i, frame in vp.iter_frame_indices([frame_index for _, frame_index in pending]):
+            step_id, frame_index = pending[i]
+            if frame is None:
+                self._entries.pop(step_id, None)
+                continue
+            self._entries[step_id] = (frame_index, compute_dhash(frame, self.hash_size))
+        return len(pending)
+
+    def find_duplicates(self) -> Dict[Hashable, List[Hashable]]:
+        """
+        ハミング距離が max_distance 以下のステップを検出
+
+        Returns:
+            ステップID -> 重複の可能性があるステップIDのリスト（重複のないステップは含まない）
+        """
+        ids = list(self._entries)
+        if len(ids) < 2:
+            return {}
+
+        num_bytes = (self.hash_size ** 2 + 7) // 8
+        hashes = np.frombuffer(
+            b"".join(self._entries[step_id][1].to_bytes(num_bytes, "big") for step_id in ids),
+            dtype=np.uint8,
+        ).reshape(len(ids), num_bytes)
+
+        duplicates: Dict[Hashable, List[Hashable]] = {}
+        # 全組み合わせのXORを行単位でまとめてビット数を数える
+        chunk = 64
+        for start in range(0, len(ids), chunk):
+            xor = hashes[start:start + chunk, None, :] ^ hashes[None, :, :]
+            distances = np.unpackbits(xor, axis=-1).sum(axis=-1)
+            for row, col in zip(*np.nonzero(distances <= self.max_distance)):
+                i = start + int(row)
+                if i != int(col):
+                    duplicates.setdefault(ids[i], []).append(ids[int(col)])
+        return duplicates
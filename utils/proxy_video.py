@@ -0,0 +1,149 @@
+"""
+プロキシ動画モジュール
+
+長いGOPの画面録画は、シークのたびに数十フレームのデコードが必要になる。
+アップロード時に縮小したフレームをすべてキーフレームとするMJPEG AVIへ
+変換しておき、エディタのプレビューはこのプロキシから読む。
+エクスポートは常に元の動画を使う。
+"""
+
+import logging
+import os
+from typing import Optional
+
+import cv2
+
+from .content_hash import compute_content_hash
+from .mp4_parser import parse_mp4_video_track
+
+logger = logging.getLogger(__name__)
+
+
+def get_proxy_path(proxy_dir: str, content_hash: str, height: int) -> str:
+    """
+    プロキシ動画のパスを取得
+
+    Args:
+        proxy_dir: プロキシの保存ディレクトリ
+        content_hash: 元の動画のコンテンツハッシュ
+        height: プロキシの高さ（ピクセル）
+
+    Returns:
+        プロキシ動画のパス
+    """
+    return os.path.join(proxy_dir, f"{content_hash}_h{height}.avi")
+
+
+def open_or_build_proxy(video_path: str, proxy_dir: str, height: int = 480,
+                        content_hash: Optional[str] = None) -> Optional[str]:
+    """
+    作成済みのプロキシがあればそのパスを返し、なければ作成する
+
+    プロキシはコンテンツハッシュをキーに保存するため、
+    元の動画が変わると別のプロキシが作成される。
+
+    Args:
+        video_path: 元の動画ファイルのパス
+        proxy_dir: プロキシの保存ディレクトリ
+        height: プロキシの高さ（ピクセル）
+        content_hash: 元の動画のコンテンツハッシュ（省略時は計算）
+
+    Returns:
+        プロキシ動画のパス。作成できなかった場合はNone。
+    """
+    if content_hash is None:
+        content_hash = compute_content_hash(video_path)
+    proxy_path = get_proxy_path(proxy_dir, content_hash, height)
+    if os.path.exists(proxy_path):
+        return proxy_path
+    return build_proxy(video_path, proxy_path, height)
+
+
+def build_proxy(video_path: str, proxy_path: str, height: int = 480) -> Optional[str]:
+    """
+    元の動画を1回の順次デコードでMJPEGのプロキシに変換
+
+    プロキシは元の動画の平均フレームレートの固定フレームレートで書き出し、
+    i番目のフレームには i / fps 秒の時点で表示されている元のフレームを入れる。
+    そのため可変フレームレートの動画でも、プロキシ上の
+    int(time_sec * fps) のフレームが元の動画の time_sec 秒のフレームになる。
+    書き終えてから名前を変えるため、途中で中断されたプロキシは使われない。
+
+    Args:
+        video_path: 元の動画ファイルのパス
+        proxy_path: 作成するプロキシ動画のパス
+        height: プロキシの高さ（元の高さより大きい場合は元の高さ）
+
+    Returns:
+        プロキシ動画のパス。元の動画が開けない場合はNone。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+
+    track = parse_mp4_video_track(video_path)
+    writer = None
+    tmp_path = f"{os.path.splitext(proxy_path)[0]}.{os.getpid()}.tmp.avi"
+    try:
+        if track is not None:
+            fps = track.fps
+            frame_times = track.frame_times
+            total_frames = track.frame_count
+        else:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_times = None
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        src_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if fps <= 0 or total_frames <= 0 or src_height <= 0:
+            return None
+
+        height = min(height, src_height)
+        width = max(1, round(src_width * height / src_height))
+
+        os.makedirs(os.path.dirname(proxy_path) or ".", exist_ok=True)
+        writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+        if not writer.isOpened():
+            return None
+
+        def frame_time(index: int) -> float:
+            if frame_times is not None:
+                return float(frame_times[index])
+            return index / fps
+
+        written = 0
+        frame_index = 0
+        while frame_index < total_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame.shape[0] != height:
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+            # 次の元フレームが表示されるまでのプロキシのフレームをこのフレームで埋める
+            if frame_index + 1 < total_frames:
+                next_time = frame_time(frame_index + 1)
+            else:
+                next_time = total_frames / fps
+            while written / fps < next_time - 1e-6:
+                writer.write(frame)
+                written += 1
+            frame_index += 1
+
+        writer.release()
+        writer = None
+        if written == 0:
+            os.unlink(tmp_path)
+            return None
+        os.replace(tmp_path, proxy_path)
+        return proxy_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.release()
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        cap.release()
@@ -0,0 +1,138 @@
+"""
+変化領域検出モジュール
+
+UI操作を録画した動画では、ステップの直前と直後のフレームの差分が
+クリックしたボタンなどの小さな領域に現れる。縮小したフレームの差分に
+モルフォロジー処理と輪郭抽出をかけ、変化した領域を rect 注釈として提案する。
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from .coord_utils import validate_rel_coords
+from .frame_snapper import make_analysis_image
+from .video_processor import VideoProcessor
+
+
+def detect_changed_regions(
+    before: np.ndarray,
+    after: np.ndarray,
+    diff_threshold: int = 25,
+    min_area_ratio: float = 0.0005,
+    max_area_ratio: float = 0.5,
+    max_regions: int = 3,
+    padding_ratio: float = 0.01,
+) -> List[List[float]]:
+    """
+    2枚のグレースケール画像の変化領域を相対座標の矩形として検出
+
+    差分を二値化し、クロージングで近い変化（文字列など）を1つの領域にまとめ、
+    オープニングで細かいノイズを除いてから外側の輪郭の外接矩形を求める。
+    画面全体が切り替わった場合（変化領域の合計が max_area_ratio 超）は提案しない。
+
+    Args:
+        before: 直前のフレーム（グレースケール）
+        after: 直後のフレーム（グレースケール、before と同じサイズ）
+        diff_threshold: 変化とみなす画素値の差
+        min_area_ratio: 提案する矩形の最小面積（画像に対する比率）
+        max_area_ratio: 変化領域の合計面積の上限（画像に対する比率）
+        max_regions: 提案する矩形の最大数（面積の大きい順）
+        padding_ratio: 矩形の周囲に加える余白（画像の幅・高さに対する比率）
+
+    Returns:
+        [x1, y1, x2, y2] の相対座標（0.0-1.0）のリスト
+    """
+    height, width = after.shape[:2]
+    _, mask = cv2.threshold(cv2.absdiff(before, after), diff_threshold, 255, cv2.THRESH_BINARY)
+
+    if cv2.countNonZero(mask) > max_area_ratio * width * height:
+        return []
+
+    kernel_size = max(3, (min(width, height) // 60) | 1)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = [cv2.boundingRect(contour) for contour in contours]
+    min_area = min_area_ratio * width * height
+    boxes = [box for box in boxes if box[2] * box[3] >= min_area]
+    boxes.sort(key=lambda box: box[2] * box[3], reverse=True)
+
+    pad_x = padding_ratio * width
+    pad_y = padding_ratio * height
+    regions = []
+    for x, y, w, h in boxes[:max_regions]:
+        rel_coords = [
+            max(0.0, (x - pad_x) / width),
+            max(0.0, (y - pad_y) / height),
+            min(1.0, (x + w + pad_x) / width),
+            min(1.0, (y + h + pad_y) / height),
+        ]
+        is_valid, _ = validate_rel_coords("rect", rel_coords)
+        if is_valid:
+            regions.append(rel_coords)
+    return regions
+
+
+def propose_rect_annotations(
+    vp: VideoProcessor,
+    timestamps: Sequence[float],
+    before_offset_sec: float = 0.5,
+    analysis_height: int = 180,
+    color: str = "#FF0000",
+    stroke_width: int = 3,
+    max_regions: int = 3,
+) -> List[List[Dict]]:
+    """
+    全ステップの変化領域を rect 注釈としてまとめて提案
+
+    各ステップの直前（timestamp - before_offset_sec）と直後（timestamp）の
+    フレームをまとめてフレーム番号順に読み、縮小画像だけを保持して比較する。
+
+    Args:
+        vp: VideoProcessor
+        timestamps: ステップのタイムスタンプ（秒）のリスト
+        before_offset_sec: 比較する直前フレームまでの時間（秒）
+        analysis_height: 解析用に縮小する高さ（ピクセル）
+        color: 注釈の色（HEX）
+        stroke_width: 注釈の線幅
+        max_regions: 1ステップあたりの最大注釈数
+
+    Returns:
+        引数と同じ順序の注釈リスト（{"type": "rect", "rel_coords", "color", "stroke_width"}）
+    """
+    pairs = []
+    frame_indices = []
+    for timestamp in timestamps:
+        after_index = vp.frame_index_for_time(timestamp)
+        before_index = vp.frame_index_for_time(max(0.0, timestamp - before_offset_sec))
+        pairs.append((before_index, after_index))
+        frame_indices.extend((before_index, after_index))
+
+    images: Dict[int, Optional[np.ndarray]] = {}
+    for i, frame in vp.iter_frame_indices(frame_indices):
+        frame_index = frame_indices[i]
+        if frame_index not in images:
+            images[frame_index] = None if frame is None else make_analysis_image(frame, analysis_height)
+
+    proposals = []
+    for before_index, after_index in pairs:
+        before = images.get(before_index)
+        after = images.get(after_index)
+        if before is None or after is None or before_index == after_index:
+            proposals.append([])
+            continue
+        regions = detect_changed_regions(before, after, max_regions=max_regions)
+        proposals.append([
+            {
+                "type": "rect",
+                "rel_coords": rel_coords,
+                "color": color,
+                "stroke_width": stroke_width,
+            }
+            for rel_coords in regions
+        ])
+    return proposals
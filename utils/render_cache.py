@@ -0,0 +1,196 @@
+"""
+描画済みステップ画像キャッシュモジュール
+
+エクスポート時にエンコード済みのステップ画像を保持し、
+見た目に関わる入力（動画・フレーム・注釈・出力形式・出力サイズ）が変わっていない
+ステップは再抽出・再描画・再エンコードせずに再利用する。
+メモリ上のLRUに加えてディスクキャッシュを指定すると、再起動後や
+別のワーカープロセスでも描画済みの画像を再利用できる。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from .disk_cache import DiskCache
+from .image_codec import get_encode_params
+
+logger = logging.getLogger(__name__)
+
+# キャッシュキーのバージョン（フレーム番号の意味が変わった場合に古い画像を使わないため）
+# （2: MP4/MOVのフレーム番号をサンプル表の表示順のサンプル番号に変更）
+RENDER_KEY_VERSION = 2
+
+
+def annotation_digest(annotations: Sequence[Dict]) -> str:
+    """
+    注釈リストの正規化ダイジェストを計算
+
+    キーの順序やタプル/リストの違いに依存しないよう、キーをソートした
+    JSONに変換してからハッシュする。
+
+    Args:
+        annotations: draw_annotations形式の注釈リスト
+
+    Returns:
+        SHA-256ダイジェスト（16進文字列）
+    """
+    canonical = json.dumps(list(annotations), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_render_key(content_hash: str, frame_index: int, annotations: Sequence[Dict],
+                    image_format: str, jpeg_quality: int, target_width: Optional[int] = None) -> str:
+    """
+    描画済みステップ画像のキャッシュキーを作成
+
+    Args:
+        content_hash: 動画のコンテンツハッシュ
+        frame_index: フレーム番号
+        annotations: draw_annotations形式の注釈リスト
+        image_format: 画像フォーマット（"jpeg" or "png"）
+        jpeg_quality: JPEG品質
+        target_width: 出力画像の最大幅（ピクセル、Noneで原寸）
+
+    Returns:
+        キャッシュキー（16進文字列）
+    """
+    # PNGではJPEG品質が結果に影響しないため、エンコードパラメータで正規化する
+    encode_params: List[int] = [int(v) for v in get_encode_params(image_format, jpeg_quality)]
+    key_source = json.dumps(
+        [RENDER_KEY_VERSION, content_hash, int(frame_index), annotation_digest(annotations), image_format, encode_params,
+         None if target_width is None else int(target_width)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    バイト数上限付きのエンコード済み画像LRUキャッシュ
+
+    disk_cache を指定した場合、メモリにない画像はディスクから読み込み、
+    格納した画像はディスクにも書き込む。スレッドセーフ。
+    """
+
+    def __init__(self, max_bytes: int, disk_cache: Optional[DiskCache] = None):
+        """
+        初期化
+
+        Args:
+            max_bytes: メモリ上のキャッシュの最大サイズ（バイト）
+            disk_cache: 永続化に使うディスクキャッシュ（オプション）
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be a non-negative value")
+        self.max_bytes = max_bytes
+        self.disk_cache = disk_cache
+        self._images: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        画像を取得
+
+        Args:
+            key: make_render_key で作成したキー
+
+        Returns:
+            エンコード済み画像。なければNone。
+        """
+        with self._lock:
+            data = self._images.get(key)
+            if data is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self.disk_cache.get(key) if self.disk_cache is not None else None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._put_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """
+        画像を格納
+
+        上限を超える場合は古い画像から破棄する。1枚で上限を超える画像はメモリには格納しない。
+
+        Args:
+            key: make_render_key で作成したキー
+            data: エンコード済み画像
+        """
+        if self.disk_cache is not None:
+            try:
+                self.disk_cache.put(key, data)
+            except OSError as e:
+                # ディスクに書けなくてもメモリ上のキャッシュは使えるため続行する
+                logger.warning(f"Failed to write render cache {key}: {e}")
+        self._put_memory(key, data)
+
+    def _put_memory(self, key: str, data: bytes):
+        """メモリ上のLRUに格納"""
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._current_bytes -= len(old)
+
+            self._images[key] = data
+            self._current_bytes += len(data)
+
+            while self._current_bytes > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._current_bytes -= len(evicted)
+
+    def __contains__(self, key: str) -> bool:
+        """ヒット/ミスを数えずに存在確認"""
+        with self._lock:
+            if key in self._images:
+                return True
+        return self.disk_cache is not None and key in self.disk_cache
+
+    def __len__(self) -> int:
+        """メモリ上の画像数"""
+        with self._lock:
+            return len(self._images)
+
+    def clear(self):
+        """メモリ上のキャッシュを空にする（ディスクキャッシュと統計はそのまま）"""
+        with self._lock:
+            self._images.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        統計情報を取得
+
+        Returns:
+            {'hits': ヒット数, 'misses': ミス数, 'entries': 格納画像数,
+             'bytes': 使用バイト数, 'max_bytes': 上限バイト数}
+            （いずれもメモリ上の値）。ディスクキャッシュがある場合は
+            'disk' にディスクキャッシュの統計を含む。
+        """
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._images),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+        if self.disk_cache is not None:
+            stats['disk'] = self.disk_cache.stats()
+        return stats
@@ -0,0 +1,179 @@
+"""
+シーン変化検出モジュール
+
+動画を1回の順次デコードで走査し、縮小したグレースケール画像の
+フレーム差分とヒストグラム距離から画面の切り替わりを検出する。
+検出結果は validate_gemini_json が受け付ける形式のステップ候補として出力する。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .mp4_parser import parse_mp4_video_track
+
+
+# ヒストグラムのビン数
+HISTOGRAM_BINS = 32
+
+
+def compute_change_scores(video_path: str, sample_fps: float = 5.0,
+                          analysis_height: int = 90) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一定間隔でサンプリングしたフレームの変化スコアを計算
+
+    サンプリング対象外のフレームは grab() のみで読み飛ばし、
+    対象フレームは縮小してからグレースケールに変換する。
+    スコアは直前のサンプルとの平均絶対差分とヒストグラムのL1距離の平均（0〜1）。
+
+    Args:
+        video_path: 動画ファイルのパス
+        sample_fps: 1秒あたりのサンプル数
+        analysis_height: 解析用に縮小する高さ（ピクセル）
+
+    Returns:
+        (サンプルの時刻（秒）の配列, 変化スコアの配列) のタプル。
+        スコアの先頭（比較対象なし）は0。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"動画ファイル '{video_path}' が開けません。")
+
+    track = parse_mp4_video_track(video_path)
+    times: List[float] = []
+    scores: List[float] = []
+    try:
+        fps = track.fps if track is not None else cap.get(cv2.CAP_PROP_FPS)
+        src_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if fps <= 0 or src_height <= 0:
+            return np.zeros(0), np.zeros(0)
+
+        height = min(analysis_height, src_height)
+        width = max(1, round(src_width * height / src_height))
+
+        prev_gray: Optional[np.ndarray] = None
+        prev_hist: Optional[np.ndarray] = None
+        frame_index = 0
+        next_sample_time = 0.0
+        while cap.grab():
+            if track is not None and frame_index < track.frame_count:
+                frame_time = float(track.frame_times[frame_index])
+            else:
+                frame_time = frame_index / fps
+            frame_index += 1
+            if frame_time + 1e-6 < next_sample_time:
+                continue
+
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            hist = np.bincount(gray.ravel() >> 3, minlength=HISTOGRAM_BINS) / gray.size
+
+            if prev_gray is None:
+                score = 0.0
+            else:
+                diff = cv2.absdiff(gray, prev_gray).mean() / 255.0
+                hist_distance = np.abs(hist - prev_hist).sum() / 2.0
+                score = float((diff + hist_distance) / 2.0)
+
+            times.append(frame_time)
+            scores.append(score)
+            prev_gray, prev_hist = gray, hist
+            next_sample_time = len(times) / sample_fps
+    finally:
+        cap.release()
+
+    return np.asarray(times, dtype=np.float64), np.asarray(scores, dtype=np.float64)
+
+
+def pick_change_points(times: np.ndarray, scores: np.ndarray, threshold: float = 0.05,
+                       min_interval_sec: float = 1.0) -> List[float]:
+    """
+    変化スコアのピークを画面の切り替わりとして選ぶ
+
+    しきい値は固定値と「中央値 + 中央絶対偏差の5倍」の大きい方を使い、
+    カーソル移動などの細かい変化が続く区間で候補が増えすぎないようにする。
+    スコアの高い順に採用し、採用済みの点から min_interval_sec 以内の点は捨てる。
+
+    Args:
+        times: サンプルの時刻（秒）の配列
+        scores: 変化スコアの配列
+        threshold: スコアの最小しきい値
+        min_interval_sec: 切り替わり同士の最小間隔（秒）
+
+    Returns:
+        切り替わり後のサンプルの時刻（秒）の昇順リスト
+    """
+    if len(scores) < 2:
+        return []
+
+    median = np.median(scores[1:])
+    mad = np.median(np.abs(scores[1:] - median))
+    cutoff = max(threshold, median + 5.0 * mad)
+
+    # 両隣以上の値を持つ局所最大のみを候補にする
+    padded = np.concatenate(([-np.inf], scores, [-np.inf]))
+    is_peak = (scores >= padded[:-2]) & (scores >= padded[2:]) & (scores > cutoff)
+    candidates = np.flatnonzero(is_peak)
+
+    picked: List[float] = []
+    for index in candidates[np.argsort(-scores[candidates], kind="stable")]:
+        time_sec = float(times[index])
+        if all(abs(time_sec - t) >= min_interval_sec for t in picked):
+            picked.append(time_sec)
+    return sorted(picked)
+
+
+def build_scene_steps(change_times: List[float], project_name: str = "",
+                      include_start: bool = True) -> Dict[str, Any]:
+    """
+    切り替わり時刻からGemini JSONと同じ形式のステップ候補を作成
+
+    Args:
+        change_times: 切り替わり時刻（秒）の昇順リスト
+        project_name: プロジェクト名
+        include_start: 動画の先頭（0秒）をステップに含めるか
+
+    Returns:
+        {"project_name": ..., "steps": [{"id", "timestamp", "title", "description"}, ...]}
+    """
+    timestamps = list(change_times)
+    if include_start and (not timestamps or timestamps[0] > 0):
+        timestamps.insert(0, 0.0)
+
+    steps = [
+        {
+            "id": i,
+            "timestamp": round(timestamp, 2),
+            "title": f"シーン {i}",
+            "description": "",
+        }
+        for i, timestamp in enumerate(timestamps, start=1)
+    ]
+    return {"project_name": project_name, "steps": steps}
+
+
+def detect_scene_steps(video_path: str, project_name: str = "",
+                       sample_fps: float = 5.0, analysis_height: int = 90,
+                       threshold: float = 0.05, min_interval_sec: float = 1.0) -> Dict[str, Any]:
+    """
+    動画の画面の切り替わりからステップ候補を作成
+
+    Args:
+        video_path: 動画ファイルのパス
+        project_name: プロジェクト名
+        sample_fps: 1秒あたりのサンプル数
+        analysis_height: 解析用に縮小する高さ（ピクセル）
+        threshold: スコアの最小しきい値
+        min_interval_sec: 切り替わり同士の最小間隔（秒）
+
+    Returns:
+        validate_gemini_json が受け付ける形式の辞書
+    """
+    times, scores = compute_change_scores(video_path, sample_fps, analysis_height)
+    change_times = pick_change_points(times, scores, threshold, min_interval_sec)
+    return build_scene_steps(change_times, project_name)
@@ -0,0 +1,325 @@
+"""
+ステップ画像レンダリングモジュール
+
+エクスポート用に、ステップごとのフレーム抽出・注釈描画・エンコードを行う。
+1プロセス内ではデコード→描画→エンコードをスレッドのパイプラインで重ねて実行でき、
+大量のステップはフレーム番号順に連続した区間へ分割し、
+複数プロセスで並列にデコードできる。
+"""
+
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .image_codec import encode_frame
+from .video_processor import VideoProcessor
+
+
+# (タイムスタンプ（秒）, draw_annotations形式の注釈リスト)
+StepRenderItem = Tuple[float, List[Dict]]
+
+
+# 注釈タイプごとの線の太さのデフォルト（VideoProcessor.draw_annotations と同じ）
+_DEFAULT_THICKNESS = {"arrow": 4}
+
+
+def target_width_for_dpi(dpi: Optional[int], width_inches: float) -> Optional[int]:
+    """
+    印刷DPIと文書上の画像幅から出力画像の幅（ピクセル）を計算
+
+    Args:
+        dpi: 目標DPI（None または0以下の場合は縮小しない）
+        width_inches: 文書に配置する画像の幅（インチ）
+
+    Returns:
+        出力画像の幅（ピクセル）。縮小しない場合はNone。
+    """
+    if not dpi or dpi <= 0:
+        return None
+    return max(1, int(round(dpi * width_inches)))
+
+
+def scale_annotations(annotations: Sequence[Dict], scale: float) -> List[Dict]:
+    """
+    縮小したフレームに描画するため注釈の線の太さを拡縮
+
+    Args:
+        annotations: draw_annotations形式の注釈リスト
+        scale: 拡縮率（出力の幅 / 元の幅）
+
+    Returns:
+        thickness を拡縮した注釈リスト（1ピクセル未満にはしない）
+    """
+    scaled = []
+    for annotation in annotations:
+        thickness = annotation.get("thickness", _DEFAULT_THICKNESS.get(annotation.get("type"), 3))
+        scaled.append({**annotation, "thickness": max(1, int(round(thickness * scale)))})
+    return scaled
+
+
+def _prepare_frame(
+    vp: VideoProcessor,
+    frame: np.ndarray,
+    annotations: List[Dict],
+    target_width: Optional[int],
+    buffer: Optional[np.ndarray],
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    フレームを出力サイズに縮小して注釈を描画
+
+    縮小する場合は縮小結果（新しい配列）に直接描画し、線の太さも同じ比率で縮める。
+    縮小しない場合は buffer（形状が合わなければ新しく確保）に描画する。
+
+    Returns:
+        (エンコードするフレーム, 描画に使ったバッファ) のタプル
+    """
+    height, width = frame.shape[:2]
+    if target_width is not None and width > target_width:
+        scale = target_width / width
+        size = (target_width, max(1, int(round(height * scale))))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if annotations:
+            vp.draw_annotations(frame, scale_annotations(annotations, scale), out=frame)
+        return frame, None
+
+    if not annotations:
+        return frame, None
+    if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+        buffer = np.empty_like(frame)
+    return vp.draw_annotations(frame, annotations, out=buffer), buffer
+
+
+def iter_rendered_steps(
+    vp: VideoProcessor,
+    items: Sequence[StepRenderItem],
+    image_format: str = "jpeg",
+    jpeg_quality: int = 95,
+    encode_workers: int = 1,
+    pipeline_depth: int = 4,
+    target_width: Optional[int] = None,
+) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """
+    ステップ画像をフレーム番号順に描画・エンコードするジェネレータ
+
+    encode_workers が2以上の場合、デコード（専用スレッド）・描画（呼び出し側スレッド）・
+    エンコード（スレッドプール）を並行して実行する。OpenCVはデコード・エンコード中に
+    GILを解放するため、ステップiのエンコードとステップi+1のデコードが重なる。
+    出力の順序とバイト列は逐次処理と同一。
+
+    Args:
+        vp: VideoProcessor
+        items: (タイムスタンプ, 注釈リスト) のリスト
+        image_format: 画像フォーマット（"jpeg" or "png"）
+        jpeg_quality: JPEG品質
+        encode_workers: エンコードスレッド数（1で逐次処理）
+        pipeline_depth: 各段の間に保持するフレーム数の上限（メモリ使用量の上限になる）
+        target_width: 出力画像の最大幅（ピクセル）。これより大きいフレームは
+                      エンコード前に縮小する（Noneで原寸）
+
+    Yields:
+        (items内のインデックス, エンコード済み画像) のタプル。
+        フレーム抽出に失敗した場合はNone。
+    """
+    if encode_workers > 1:
+        yield from _iter_rendered_steps_pipelined(
+            vp, items, image_format, jpeg_quality, encode_workers, max(pipeline_depth, encode_workers),
+            target_width,
+        )
+        return
+
+    timestamps = [timestamp for timestamp, _ in items]
+    # 注釈は使い回しの描画バッファに描く（キャッシュ済み・同一フレームの元画像は変更しない）。
+    # エンコード結果はバイト列にコピーされるため、次のステップで上書きしてよい。
+    buffer: Optional[np.ndarray] = None
+    for idx, frame in vp.iter_frames(timestamps):
+        if frame is None:
+            yield idx, None
+            continue
+
+        frame, used_buffer = _prepare_frame(vp, frame, items[idx][1], target_width, buffer)
+        buffer = used_buffer if used_buffer is not None else buffer
+        yield idx, encode_frame(frame, image_format, jpeg_quality)
+
+
+# デコードスレッドの終了を示す番兵
+_DECODE_DONE = object()
+
+
+def _iter_rendered_steps_pipelined(
+    vp: VideoProcessor,
+    items: Sequence[StepRenderItem],
+    image_format: str,
+    jpeg_quality: int,
+    encode_workers: int,
+    pipeline_depth: int,
+    target_width: Optional[int],
+) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """デコード→描画→エンコードの3段パイプライン（iter_rendered_steps から使用）"""
+    timestamps = [timestamp for timestamp, _ in items]
+    decoded: "queue.Queue" = queue.Queue(maxsize=pipeline_depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # 呼び出し側が中断した場合にキューの空きを待ち続けないよう、定期的に停止を確認する
+        while not stop.is_set():
+            try:
+                decoded.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decode():
+        frames = vp.iter_frames(timestamps)
+        try:
+            for item in frames:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(e)
+            return
+        finally:
+            frames.close()
+        put(_DECODE_DONE)
+
+    decoder = threading.Thread(target=decode, name="step-decoder", daemon=True)
+    decoder.start()
+
+    # エンコード中のフレームは上書きできないため、描画バッファはエンコード完了後に再利用する
+    free_buffers: List[np.ndarray] = []
+    # (items内のインデックス, エンコード結果, 使用中の描画バッファ) をフレーム番号順に保持
+    in_flight: Deque[Tuple[int, Optional[Future], Optional[np.ndarray]]] = deque()
+
+    def pop_result() -> Tuple[int, Optional[bytes]]:
+        idx, future, buffer = in_flight.popleft()
+        if future is None:
+            return idx, None
+        data = future.result()
+        if buffer is not None:
+            free_buffers.append(buffer)
+        return idx, data
+
+    try:
+        with ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix="step-encoder") as executor:
+            while True:
+                item = decoded.get()
+                if item is _DECODE_DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+
+                idx, frame = item
+                if frame is None:
+                    in_flight.append((idx, None, None))
+                else:
+                    free_buffer = free_buffers.pop() if free_buffers else None
+                    frame, buffer = _prepare_frame(vp, frame, items[idx][1], target_width, free_buffer)
+                    if free_buffer is not None and buffer is None:
+                        # 描画に使わなかったバッファはすぐに戻す
+                        free_buffers.append(free_buffer)
+                    future = executor.submit(encode_frame, frame, image_format, jpeg_quality)
+                    in_flight.append((idx, future, buffer))
+
+                # 完了済みの先頭は順に返し、上限に達したら先頭の完了を待つ
+                while in_flight and (
+                    len(in_flight) >= pipeline_depth
+                    or in_flight[0][1] is None
+                    or in_flight[0][1].done()
+                ):
+                    yield pop_result()
+
+            while in_flight:
+                yield pop_result()
+    finally:
+        stop.set()
+        decoder.join()
+
+
+def _render_chunk(
+    video_path: str,
+    indexed_items: List[Tuple[int, StepRenderItem]],
+    image_format: str,
+    jpeg_quality: int,
+    target_width: Optional[int] = None,
+) -> List[Tuple[int, Optional[bytes]]]:
+    """ワーカープロセス: 専用のキャプチャで区間内のステップを描画"""
+    items = [item for _, item in indexed_items]
+    with VideoProcessor(video_path) as vp:
+        return [
+            (indexed_items[i][0], data)
+            for i, data in iter_rendered_steps(vp, items, image_format, jpeg_quality,
+                                               target_width=target_width)
+        ]
+
+
+def partition_by_time(items: Sequence[StepRenderItem], parts: int) -> List[List[Tuple[int, StepRenderItem]]]:
+    """
+    ステップをタイムスタンプ順に並べ、連続した区間に分割
+
+    Args:
+        items: (タイムスタンプ, 注釈リスト) のリスト
+        parts: 分割数
+
+    Returns:
+        (items内のインデックス, 要素) のリストを区間ごとにまとめたリスト
+    """
+    ordered = sorted(enumerate(items), key=lambda pair: pair[1][0])
+    parts = max(1, min(parts, len(ordered)))
+    chunk_size, remainder = divmod(len(ordered), parts)
+
+    chunks = []
+    start = 0
+    for i in range(parts):
+        end = start + chunk_size + (1 if i < remainder else 0)
+        chunks.append(ordered[start:end])
+        start = end
+    return chunks
+
+
+def iter_rendered_steps_parallel(
+    video_path: str,
+    items: Sequence[StepRenderItem],
+    image_format: str = "jpeg",
+    jpeg_quality: int = 95,
+    workers: int = 2,
+    target_width: Optional[int] = None,
+) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """
+    ステップ画像を複数プロセスで描画・エンコードするジェネレータ
+
+    タイムスタンプ順の連続した区間ごとに1プロセスが自分のキャプチャで
+    デコードし、エンコード済みのバイト列だけを返す（フレーム配列は転送しない）。
+    出力は iter_rendered_steps と同一のバイト列になる。
+
+    Args:
+        video_path: 動画ファイルのパス
+        items: (タイムスタンプ, 注釈リスト) のリスト
+        image_format: 画像フォーマット（"jpeg" or "png"）
+        jpeg_quality: JPEG品質
+        workers: ワーカープロセス数
+        target_width: 出力画像の最大幅（ピクセル、Noneで原寸）
+
+    Yields:
+        (items内のインデックス, エンコード済み画像) のタプル（区間の完了順）。
+        フレーム抽出に失敗した場合はNone。
+    """
+    chunks = partition_by_time(items, workers)
+    if not chunks or not chunks[0]:
+        return
+
+    # Streamlitのスレッドを含むプロセスをforkしないようspawnを使用
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=context) as executor:
+        futures = [
+            executor.submit(_render_chunk, video_path, chunk, image_format, jpeg_quality, target_width)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            for idx, data in future.result():
+                yield idx, data
@@ -9,6 +9,8 @@ from typing import Optional
 import numpy as np
 import cv2
 
+from .image_codec import get_encode_params
+
 
 class TempFileManager:
     """一時ファイルを管理するクラス"""
@@ -56,10 +58,7 @@ class TempFileManager:
 
         filepath = self.temp_dir / filename
 
-        if image_format == "png":
-            params = [cv2.IMWRITE_PNG_COMPRESSION, 3]
-        else:
-            params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        params = get_encode_params(image_format, jpeg_quality)
 
         cv2.imwrite(str(filepath), frame, params)
         self.created_files.append(filepath)
@@ -0,0 +1,447 @@
+"""
+一時ファイル掃除モジュール
+
+異常終了したエクスポートが一時ディレクトリに残した m2m_ ディレクトリと、
+アップロード動画・プロキシ動画・サムネイルアトラス・キーフレームインデックスの
+保存先を走査し、TTLより古いものと合計サイズの上限を超えた分を削除する。
+保存先の中では拡張子を除いた名前が同じファイル（アトラスの .u8 と .json 等）を
+1つのエントリとしてまとめて削除する。一時ディレクトリは他のプログラムと
+共有されるため、このアプリが作成したと分かるもの（m2m_ ディレクトリ）以外は対象にしない。
+稼働中のセッションが使用しているパスは削除しない。
+
+起動時・バックグラウンドスレッドで定期的に実行できるほか、
+コマンドラインからも実行できる（sweep_temp.py から main() を呼び出す）。
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# TempFileManager が作成する一時ディレクトリのプレフィックス
+_TEMP_DIR_PREFIX = "m2m_"
+
+# セッションのリースファイルの拡張子と、書き込み途中のファイルのプレフィックス
+_LEASE_SUFFIX = ".json"
+_PARTIAL_LEASE_PREFIX = ".lease-"
+
+
+class LivePathRegistry:
+    """
+    稼働中のセッションが使用しているパスの登録簿
+
+    各セッションは実行のたびに touch() で使用中のパスを登録し直す。
+    ttl_sec の間 touch されなかったセッションは終了したものとみなす。
+    スレッドセーフ。
+
+    lease_dir を指定すると、セッションごとのリースファイル（使用中のパスのJSON、
+    更新時刻が最終アクセス時刻）として保存するため、複数のStreamlitワーカープロセスや
+    コマンドラインの掃除からも同じ登録簿を参照できる。省略時はプロセス内だけで保持するため、
+    単一プロセスで動かす場合にしか使えない。
+    """
+
+    def __init__(self, ttl_sec: float, lease_dir: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            ttl_sec: セッションを稼働中とみなす最終アクセスからの時間（秒）
+            lease_dir: リースファイルの保存ディレクトリ（Noneでプロセス内のみ）
+        """
+        self.ttl_sec = ttl_sec
+        self.lease_dir = lease_dir
+        self._sessions: Dict[str, Tuple[float, Set[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _lease_path(self, session_id: str) -> str:
+        """セッションのリースファイルのパス（セッションIDはハッシュしてファイル名にする）"""
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.lease_dir, f"{digest}{_LEASE_SUFFIX}")
+
+    def touch(self, session_id: str, paths: Iterable[Optional[str]]):
+        """
+        セッションが使用中のパスを登録（前回の登録は置き換える）
+
+        Args:
+            session_id: セッションID
+            paths: 使用中のファイル・ディレクトリのパス（Noneは無視）
+        """
+        live = {os.path.abspath(path) for path in paths if path}
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            self._sessions[session_id] = (time.time(), live)
+        if self.lease_dir is not None:
+            self._write_lease(session_id, live, unchanged=previous is not None and previous[1] == live)
+
+    def _write_lease(self, session_id: str, live: Set[str], unchanged: bool):
+        """リースファイルを更新（内容が前回と同じなら更新時刻だけ更新）"""
+        lease_path = self._lease_path(session_id)
+        if unchanged:
+            try:
+                os.utime(lease_path)
+                return
+            except FileNotFoundError:
+                pass
+
+        os.makedirs(self.lease_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.lease_dir, prefix=_PARTIAL_LEASE_PREFIX, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"paths": sorted(live)}, f)
+            os.replace(tmp_path, lease_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def live_paths(self) -> Set[str]:
+        """
+        稼働中のセッションが使用しているパスを取得（期限切れのセッションは削除）
+
+        Returns:
+            絶対パスの集合
+        """
+        now = time.time()
+        paths: Set[str] = set()
+        with self._lock:
+            for session_id, (last_seen, session_paths) in list(self._sessions.items()):
+                if now - last_seen > self.ttl_sec:
+                    del self._sessions[session_id]
+                else:
+                    paths.update(session_paths)
+        if self.lease_dir is not None:
+            paths.update(self._read_leases(now))
+        return paths
+
+    def _read_leases(self, now: float) -> Set[str]:
+        """全プロセスのリースファイルから使用中のパスを読み込む（期限切れのファイルは削除）"""
+        paths: Set[str] = set()
+        try:
+            entries = list(os.scandir(self.lease_dir))
+        except FileNotFoundError:
+            return paths
+
+        for entry in entries:
+            try:
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+            except FileNotFoundError:
+                continue
+            if now - mtime > self.ttl_sec:
+                # 期限切れのリースと中断された書き込み途中のファイルを削除
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+                continue
+            if not entry.name.endswith(_LEASE_SUFFIX):
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    paths.update(json.load(f)["paths"])
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Broken session lease {entry.path}: {e}")
+        return paths
+
+
+class SweepResult:
+    """掃除の結果を保持するクラス"""
+
+    def __init__(self):
+        self.removed: List[str] = []
+        self.reclaimed_bytes = 0
+        self.skipped_live = 0
+        self.errors = 0
+
+    def __repr__(self) -> str:
+        return (f"SweepResult(removed={len(self.removed)}, reclaimed_bytes={self.reclaimed_bytes}, "
+                f"skipped_live={self.skipped_live}, errors={self.errors})")
+
+
+def _path_usage(path: str) -> Tuple[int, float]:
+    """
+    ファイル・ディレクトリのサイズと最終使用時刻
+
+    ディレクトリは中のファイルの合計サイズと最も新しい時刻を返す
+    （ディレクトリ自体のアクセス時刻は走査で更新されるため使わない）。
+
+    Returns:
+        (バイト数, 最終使用時刻（アクセス時刻と更新時刻の新しい方）)
+    """
+    stat = os.stat(path, follow_symlinks=False)
+    if not os.path.isdir(path) or os.path.islink(path):
+        return stat.st_size, max(stat.st_atime, stat.st_mtime)
+
+    last_used = stat.st_mtime
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                file_stat = os.stat(os.path.join(dirpath, name), follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            size += file_stat.st_size
+            last_used = max(last_used, file_stat.st_atime, file_stat.st_mtime)
+    return size, last_used
+
+
+def _entry_usage(paths: Sequence[str]) -> Tuple[int, float]:
+    """
+    まとめて削除するパス群の合計サイズと最終使用時刻
+
+    Returns:
+        (バイト数, 最も新しい最終使用時刻)。すべて削除済みの場合は FileNotFoundError。
+    """
+    size = 0
+    last_used = None
+    for path in paths:
+        try:
+            path_size, path_last_used = _path_usage(path)
+        except FileNotFoundError:
+            continue
+        size += path_size
+        last_used = path_last_used if last_used is None else max(last_used, path_last_used)
+    if last_used is None:
+        raise FileNotFoundError(paths[0])
+    return size, last_used
+
+
+def _entry_stem(name: str) -> str:
+    """保存先の中でまとめて削除する単位の名前（最初の "." より前。"." で始まる名前はそのまま）"""
+    stem = name.split(".", 1)[0]
+    return stem or name
+
+
+def _list_candidates(temp_dir: str, cache_dirs: Sequence[str], keep_dirs: Sequence[str]) -> List[List[str]]:
+    """掃除の対象になるエントリ（まとめて削除するパスのリスト）を列挙"""
+    keep = {os.path.abspath(path) for path in keep_dirs}
+    candidates: List[List[str]] = []
+
+    try:
+        names = os.listdir(temp_dir)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = os.path.abspath(os.path.join(temp_dir, name))
+        if path in keep:
+            continue
+        if name.startswith(_TEMP_DIR_PREFIX) and os.path.isdir(path) and not os.path.islink(path):
+            candidates.append([path])
+
+    for cache_dir in cache_dirs:
+        try:
+            names = os.listdir(cache_dir)
+        except FileNotFoundError:
+            continue
+        groups: Dict[str, List[str]] = {}
+        for name in sorted(names):
+            groups.setdefault(_entry_stem(name), []).append(os.path.abspath(os.path.join(cache_dir, name)))
+        candidates.extend(groups.values())
+
+    return candidates
+
+
+def _is_live(path: str, live_paths: Set[str]) -> bool:
+    """パス自体、またはディレクトリの中のファイルが使用中か"""
+    if path in live_paths:
+        return True
+    prefix = path + os.sep
+    return any(live.startswith(prefix) for live in live_paths)
+
+
+def _remove(path: str):
+    """ファイルまたはディレクトリを削除"""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.unlink(path)
+
+
+def sweep_temp_files(
+    temp_dir: Optional[str] = None,
+    cache_dirs: Sequence[str] = (),
+    keep_dirs: Sequence[str] = (),
+    ttl_sec: float = 7 * 24 * 3600,
+    quota_bytes: Optional[int] = None,
+    min_age_sec: float = 600,
+    live_paths: Iterable[str] = (),
+    dry_run: bool = False,
+) -> SweepResult:
+    """
+    一時ファイル・アップロード動画を掃除
+
+    最終使用時刻が ttl_sec より古いものを削除し、残りの合計サイズが quota_bytes を
+    超える場合は最終使用時刻の古いものから削除する。min_age_sec より新しいもの
+    （書き込み中のアップロードや実行中のエクスポート）と使用中のパスは削除しない。
+
+    Args:
+        temp_dir: m2m_ ディレクトリを探す一時ディレクトリ
+                  （省略時はシステムの一時ディレクトリ）
+        cache_dirs: 中のエントリをすべて対象にするディレクトリ（アップロード動画・アトラスの保存先等）
+        keep_dirs: temp_dir 内で対象から除くパス（永続キャッシュのルート等）
+        ttl_sec: 削除するまでの最終使用からの時間（秒）
+        quota_bytes: 対象の合計サイズ上限（バイト、Noneで上限なし）
+        min_age_sec: 上限を超えていても削除しない最終使用からの時間（秒）
+        live_paths: 使用中のパス（稼働中のセッションが参照している動画等）
+        dry_run: Trueの場合は削除せずに対象を数えるだけ
+
+    Returns:
+        SweepResult
+    """
+    temp_dir = temp_dir or tempfile.gettempdir()
+    live = {os.path.abspath(path) for path in live_paths}
+    now = time.time()
+    result = SweepResult()
+
+    entries = []
+    for paths in _list_candidates(temp_dir, cache_dirs, keep_dirs):
+        try:
+            size, last_used = _entry_usage(paths)
+        except FileNotFoundError:
+            continue
+        if any(_is_live(path, live) for path in paths):
+            result.skipped_live += 1
+            continue
+        entries.append((last_used, size, paths))
+
+    def remove(size: int, paths: List[str]) -> bool:
+        removed = False
+        for path in paths:
+            if not dry_run:
+                try:
+                    _remove(path)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.warning(f"Failed to remove {path}: {e}")
+                    result.errors += 1
+                    continue
+            result.removed.append(path)
+            removed = True
+        if removed:
+            result.reclaimed_bytes += size
+        return removed
+
+    remaining = []
+    for last_used, size, paths in sorted(entries):
+        if now - last_used > ttl_sec:
+            remove(size, paths)
+        else:
+            remaining.append((last_used, size, paths))
+
+    if quota_bytes is not None:
+        total = sum(size for _, size, _ in remaining)
+        for last_used, size, paths in remaining:
+            if total <= quota_bytes or now - last_used < min_age_sec:
+                break
+            if remove(size, paths):
+                total -= size
+
+    if result.removed:
+        logger.info(f"Swept {len(result.removed)} temp entries, reclaimed {result.reclaimed_bytes} bytes")
+    return result
+
+
+class TempSweeper:
+    """
+    一定間隔で sweep_temp_files を実行するバックグラウンドスレッド
+
+    使用中のパスは実行のたびに live_paths_provider から取得する。
+    """
+
+    def __init__(self, interval_sec: float, live_paths_provider: Optional[Callable[[], Iterable[str]]] = None,
+                 **sweep_kwargs):
+        """
+        初期化
+
+        Args:
+            interval_sec: 実行間隔（秒）
+            live_paths_provider: 使用中のパスを返す関数（LivePathRegistry.live_paths 等）
+            **sweep_kwargs: sweep_temp_files に渡す引数（live_paths 以外）
+        """
+        self.interval_sec = interval_sec
+        self.live_paths_provider = live_paths_provider
+        self.sweep_kwargs = sweep_kwargs
+        self.last_result: Optional[SweepResult] = None
+        self.total_reclaimed_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self) -> SweepResult:
+        """
+        1回掃除を実行
+
+        Returns:
+            SweepResult
+        """
+        live_paths = self.live_paths_provider() if self.live_paths_provider is not None else ()
+        result = sweep_temp_files(live_paths=live_paths, **self.sweep_kwargs)
+        self.last_result = result
+        self.total_reclaimed_bytes += result.reclaimed_bytes
+        return result
+
+    def _run(self):
+        # 起動直後に1回実行し、以降は interval_sec ごとに実行する
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"Temp sweep failed: {e}")
+            self._stop.wait(self.interval_sec)
+
+    def start(self) -> "TempSweeper":
+        """バックグラウンドスレッドを開始（開始済みなら何もしない）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="temp-sweeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """バックグラウンドスレッドを停止"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """コマンドラインから掃除を実行"""
+    import config
+
+    parser = argparse.ArgumentParser(description="一時ファイル・アップロード動画を掃除します。")
+    parser.add_argument("--ttl-hours", type=float, default=config.TEMP_SWEEP_TTL_SEC / 3600,
+                        help="削除するまでの最終使用からの時間（時間）")
+    parser.add_argument("--quota-gb", type=float, default=config.TEMP_SWEEP_QUOTA_BYTES / 1024 ** 3,
+                        help="対象の合計サイズ上限（GB）")
+    # 使用中のパスはリースファイルから取得する。登録前のアップロード等も守るため、
+    # 既定ではセッションの有効期間内に使われたものは上限を超えていても削除しない
+    parser.add_argument("--min-age-hours", type=float, default=config.LIVE_SESSION_TTL_SEC / 3600,
+                        help="上限を超えていても削除しない最終使用からの時間（時間）")
+    parser.add_argument("--dry-run", action="store_true", help="削除せずに対象を表示する")
+    args = parser.parse_args(argv)
+
+    result = sweep_temp_files(
+        cache_dirs=config.TEMP_SWEEP_CACHE_DIRS,
+        keep_dirs=[config.CACHE_DIR],
+        ttl_sec=args.ttl_hours * 3600,
+        quota_bytes=int(args.quota_gb * 1024 ** 3),
+        min_age_sec=args.min_age_hours * 3600,
+        live_paths=LivePathRegistry(config.LIVE_SESSION_TTL_SEC, config.LIVE_SESSION_DIR).live_paths(),
+        dry_run=args.dry_run,
+    )
+    for path in result.removed:
+        print(("[dry-run] " if args.dry_run else "") + path)
+    print(f"{len(result.removed)}件 {result.reclaimed_bytes / (1024 * 1024):.1f} MB を"
+          f"{'削除できます' if args.dry_run else '削除しました'}"
+          f"（使用中のためスキップ: {result.skipped_live}件、エラー: {result.errors}件）")
+    return 1 if result.errors else 0
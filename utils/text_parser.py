@@ -249,13 +249,6 @@ def validate_saved_json(
                 )
                 continue
 
-            # polygon注釈のフィルタリング（VideoProcessorが未サポートのため）
-            if ann_type == "polygon":
-                result.add_warning(
-                    f"steps[{idx}] (id={step_id}): annotations[{ann_idx}] の polygon 注釈はサポート対象外のためスキップします"
-                )
-                continue
-
             # rel_coords チェック
             if "rel_coords" not in ann:
                 result.add_warning(
@@ -0,0 +1,213 @@
+"""
+サムネイルアトラスモジュール
+
+動画全体を低いサンプリングレート・小さい高さで一度だけデコードし、
+連続したuint8配列（numpy.memmap）としてディスクに保存する。
+スライダーやステップ一覧のサムネイルはデコードせずにここから読む。
+"""
+
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .content_hash import compute_content_hash
+from .video_processor import VideoProcessor
+
+logger = logging.getLogger(__name__)
+
+# メタデータのフォーマットバージョン
+# （2: MP4/MOVはサンプル表のフレーム時刻でサンプリング）
+THUMBNAIL_ATLAS_VERSION = 2
+
+
+class ThumbnailAtlas:
+    """
+    サムネイルアトラス
+
+    data は (サンプル数, 高さ, 幅, 3) のBGR配列（読み取り専用のmemmap）。
+    i番目のサンプルは i / sample_fps 秒のフレーム。
+    """
+
+    def __init__(self, data: np.ndarray, sample_fps: float):
+        """
+        初期化
+
+        Args:
+            data: (サンプル数, 高さ, 幅, 3) のBGR配列
+            sample_fps: 1秒あたりのサンプル数
+        """
+        self.data = data
+        self.sample_fps = sample_fps
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def get(self, time_sec: float) -> Optional[np.ndarray]:
+        """
+        指定秒数に最も近いサムネイルを取得
+
+        Args:
+            time_sec: 時間（秒）
+
+        Returns:
+            サムネイル画像（BGR、読み取り専用）。アトラスが空の場合はNone。
+        """
+        if len(self) == 0:
+            return None
+        index = min(max(int(round(time_sec * self.sample_fps)), 0), len(self) - 1)
+        return self.data[index]
+
+    @staticmethod
+    def _paths(atlas_dir: str, content_hash: str) -> Dict[str, str]:
+        """アトラスのデータ・メタデータファイルのパス"""
+        return {
+            "data": os.path.join(atlas_dir, f"{content_hash}.u8"),
+            "meta": os.path.join(atlas_dir, f"{content_hash}.json"),
+        }
+
+    @classmethod
+    def file_paths(cls, atlas_dir: str, content_hash: str) -> List[str]:
+        """
+        アトラスを構成するファイルのパスを取得（ファイルの有無は問わない）
+
+        Args:
+            atlas_dir: アトラスの保存ディレクトリ
+            content_hash: 動画のコンテンツハッシュ
+
+        Returns:
+            データファイルとメタデータファイルのパスのリスト
+        """
+        return list(cls._paths(atlas_dir, content_hash).values())
+
+    @classmethod
+    def open(cls, atlas_dir: str, content_hash: str) -> Optional["ThumbnailAtlas"]:
+        """
+        作成済みのアトラスを開く
+
+        Args:
+            atlas_dir: アトラスの保存ディレクトリ
+            content_hash: 動画のコンテンツハッシュ
+
+        Returns:
+            ThumbnailAtlas。未作成または破損している場合はNone。
+        """
+        paths = cls._paths(atlas_dir, content_hash)
+        if not os.path.exists(paths["meta"]):
+            return None
+        try:
+            with open(paths["meta"], "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != THUMBNAIL_ATLAS_VERSION:
+                return None
+            shape = (meta["count"], meta["height"], meta["width"], 3)
+            if meta["count"] == 0:
+                return cls(np.zeros(shape, dtype=np.uint8), meta["sample_fps"])
+            data = np.memmap(paths["data"], dtype=np.uint8, mode="r", shape=shape)
+            return cls(data, meta["sample_fps"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Broken thumbnail atlas {paths['meta']}: {e}")
+            return None
+
+    @classmethod
+    def open_or_build(cls, video_path: str, atlas_dir: str,
+                      sample_fps: float = 2.0, height: int = 90,
+                      content_hash: Optional[str] = None) -> Optional["ThumbnailAtlas"]:
+        """
+        作成済みのアトラスがあれば開き、なければ作成する
+
+        Args:
+            video_path: 動画ファイルのパス
+            atlas_dir: アトラスの保存ディレクトリ
+            sample_fps: 1秒あたりのサンプル数
+            height: サムネイルの高さ（ピクセル）
+            content_hash: 動画のコンテンツハッシュ（省略時は計算）
+
+        Returns:
+            ThumbnailAtlas。動画が開けない場合はNone。
+        """
+        if content_hash is None:
+            content_hash = compute_content_hash(video_path)
+        atlas = cls.open(atlas_dir, content_hash)
+        if atlas is not None:
+            return atlas
+        return cls.build(video_path, atlas_dir, content_hash, sample_fps, height)
+
+    @classmethod
+    def build(cls, video_path: str, atlas_dir: str, content_hash: str,
+              sample_fps: float = 2.0, height: int = 90) -> Optional["ThumbnailAtlas"]:
+        """
+        動画を1回の順次デコードでアトラス化して保存
+
+        各サンプルの時刻に表示されているフレームを VideoProcessor.frame_index_for_time で
+        求める（MP4/MOVは可変フレームレートでもサンプル表の正確なフレーム時刻を使う）。
+        サンプリング対象外のフレームは grab() のみで読み飛ばす。
+        データを書き終えてからメタデータを置くため、途中で中断された
+        アトラスは open() で開かれない。
+
+        Args:
+            video_path: 動画ファイルのパス
+            atlas_dir: アトラスの保存ディレクトリ
+            content_hash: 動画のコンテンツハッシュ
+            sample_fps: 1秒あたりのサンプル数
+            height: サムネイルの高さ（ピクセル）
+
+        Returns:
+            ThumbnailAtlas。動画が開けない場合はNone。
+        """
+        try:
+            vp = VideoProcessor(video_path)
+        except IOError:
+            return None
+
+        try:
+            if vp.duration_sec <= 0 or vp.height <= 0:
+                return None
+
+            height = min(height, vp.height)
+            width = max(1, round(vp.width * height / vp.height))
+            capacity = int(math.ceil(vp.duration_sec * sample_fps))
+            timestamps = [i / sample_fps for i in range(capacity)]
+
+            os.makedirs(atlas_dir, exist_ok=True)
+            paths = cls._paths(atlas_dir, content_hash)
+            tmp_data_path = f"{paths['data']}.{os.getpid()}.tmp"
+            data = np.memmap(tmp_data_path, dtype=np.uint8, mode="w+",
+                             shape=(max(capacity, 1), height, width, 3))
+
+            try:
+                # サンプルは時刻順のため、iter_frames は先頭から順に返す
+                count = 0
+                for i, frame in vp.iter_frames(timestamps):
+                    if frame is None:
+                        break
+                    data[i] = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                    count = i + 1
+
+                data.flush()
+                del data
+            except BaseException:
+                if os.path.exists(tmp_data_path):
+                    os.unlink(tmp_data_path)
+                raise
+        finally:
+            vp.close()
+
+        os.replace(tmp_data_path, paths["data"])
+        meta = {
+            "version": THUMBNAIL_ATLAS_VERSION,
+            "sample_fps": sample_fps,
+            "count": count,
+            "height": height,
+            "width": width,
+        }
+        tmp_meta_path = f"{paths['meta']}.{os.getpid()}.tmp"
+        with open(tmp_meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta_path, paths["meta"])
+
+        return cls.open(atlas_dir, content_hash)
@@ -0,0 +1,143 @@
+"""
+アップロード動画保存モジュール
+
+アップロードされた動画をチャンク単位でディスクへコピーしながら
+コンテンツハッシュを計算し、同じ動画を1ファイルにまとめて保存する。
+ディスク使用量が上限を超えた場合は古いアップロードから削除する
+（稼働中のセッションが使用している動画は削除しない）。
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import BinaryIO, Callable, Iterable, Optional, Tuple
+
+from .content_hash import remember_content_hash
+
+logger = logging.getLogger(__name__)
+
+# コピー時のチャンクサイズ（バイト）
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 書き込み途中のファイルのプレフィックス
+_PARTIAL_PREFIX = ".upload-"
+
+
+class UploadStore:
+    """コンテンツハッシュで重複排除するアップロード動画の保存先"""
+
+    def __init__(self, root_dir: str, quota_bytes: int,
+                 live_paths_provider: Optional[Callable[[], Iterable[str]]] = None):
+        """
+        初期化
+
+        Args:
+            root_dir: 保存ディレクトリ
+            quota_bytes: 保存ディレクトリの合計サイズ上限（バイト）
+            live_paths_provider: 使用中のパスを返す関数（LivePathRegistry.live_paths 等）。
+                                 返されたパスは上限を超えていても削除しない。
+        """
+        self.root_dir = root_dir
+        self.quota_bytes = quota_bytes
+        self.live_paths_provider = live_paths_provider
+
+    def save(self, fileobj: BinaryIO, suffix: str = "") -> Tuple[str, str]:
+        """
+        アップロードされたファイルを保存
+
+        ファイル全体をメモリに載せず、チャンク単位でコピーしながら
+        SHA-256を計算する。同じ内容のファイルが保存済みなら、
+        コピーしたファイルは破棄して既存のファイルを返す。
+
+        Args:
+            fileobj: 読み込み可能なバイナリファイルオブジェクト
+            suffix: 保存するファイルの拡張子（例: ".mp4"）
+
+        Returns:
+            (保存されたファイルのパス, コンテンツハッシュ) のタプル
+        """
+        os.makedirs(self.root_dir, exist_ok=True)
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, prefix=_PARTIAL_PREFIX, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    out.write(chunk)
+
+            digest = hasher.hexdigest()
+            final_path = os.path.join(self.root_dir, f"{digest}{suffix.lower()}")
+            if os.path.exists(final_path):
+                # 同じ動画は再利用し、アクセス時刻だけ更新する
+                # （更新時刻はVideoProcessorPoolのキーに含まれるため変えない）
+                os.unlink(tmp_path)
+                stat = os.stat(final_path)
+                os.utime(final_path, ns=(time.time_ns(), stat.st_mtime_ns))
+            else:
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        remember_content_hash(final_path, digest)
+        self.enforce_quota(keep=[final_path])
+        return final_path, digest
+
+    def enforce_quota(self, keep: Iterable[str] = ()) -> int:
+        """
+        合計サイズが上限を超えていれば、アクセス時刻の古いファイルから削除
+
+        keep と、live_paths_provider が返す使用中のパスは削除しない。
+
+        Args:
+            keep: 削除しないファイルのパス
+
+        Returns:
+            削除したバイト数
+        """
+        keep_paths = {os.path.abspath(p) for p in keep}
+        if self.live_paths_provider is not None:
+            keep_paths.update(os.path.abspath(p) for p in self.live_paths_provider())
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.root_dir)
+        except FileNotFoundError:
+            return 0
+
+        for name in names:
+            if name.startswith(_PARTIAL_PREFIX):
+                continue
+            path = os.path.abspath(os.path.join(self.root_dir, name))
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            if path not in keep_paths:
+                entries.append((stat.st_atime, stat.st_size, path))
+
+        reclaimed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.quota_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to remove upload {path}: {e}")
+                continue
+            total -= size
+            reclaimed += size
+
+        return reclaimed
@@ -0,0 +1,329 @@
+"""
+VideoProcessorプールモジュール
+
+Streamlitのリラン毎に動画を開き直さないよう、VideoProcessorを
+プロセス内で使い回す。キーは動画パス + 更新時刻 + サイズ。
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .background_jobs import BackgroundJobRunner
+from .frame_cache import FrameCache
+from .keyframe_index import KeyframeIndex
+from .video_processor import VideoProcessor
+
+logger = logging.getLogger(__name__)
+
+
+PoolKey = Tuple[str, int, int]
+
+
+class _PooledProcessor:
+    """プール内のVideoProcessorと最終使用時刻"""
+
+    def __init__(self, key: PoolKey, processor: VideoProcessor):
+        self.key = key
+        self.processor = processor
+        self.last_used = time.monotonic()
+
+
+class VideoProcessorPool:
+    """
+    VideoProcessorのプール
+
+    lease() で貸し出したVideoProcessorは貸出中の呼び出し元だけが使用する
+    （同じ動画に同時アクセスがあれば別のインスタンスを開く）。
+    返却されたインスタンスはアイドルとして保持され、アイドル時間の超過
+    または最大オープン数の超過で古いものから閉じられる。
+    貸出中のインスタンス数が最大オープン数に達している場合、lease() は返却を待つ
+    （同じスレッドで lease() を入れ子にすると上限に数えられるため、入れ子にしないこと）。
+    アイドル時間の超過は貸し出し・返却のたびに確認するほか、アイドルのインスタンスが
+    ある間はタイマーで最も古いものの期限に確認するため、利用がない間も閉じられる。
+    frame_cache_bytes を指定すると、同じ動画のインスタンス間で
+    FrameCacheを共有する（動画のインスタンスがすべて閉じられると破棄）。
+    keyframe_index_dir を指定すると、動画を開く際にキーフレームインデックスの
+    サイドカーを読み込む（なければ作成する）。background_jobs も指定すると、
+    読み込み・作成（コンテンツハッシュの計算とパケットの走査）をバックグラウンドで行い、
+    完了するまでは通常のシークで読み込む（完了後の貸し出しでインデックスを設定する）。
+    """
+
+    def __init__(self, max_open: int = 4, idle_timeout_sec: float = 300.0,
+                 frame_cache_bytes: int = 0, keyframe_index_dir: Optional[str] = None,
+                 background_jobs: Optional[BackgroundJobRunner] = None):
+        """
+        初期化
+
+        Args:
+            max_open: 同時に開いておくVideoProcessorの上限（貸出中・アイドルの合計）
+            idle_timeout_sec: アイドル状態のVideoProcessorを閉じるまでの秒数
+            frame_cache_bytes: 動画ごとのフレームキャッシュ上限（バイト）。0で無効。
+            keyframe_index_dir: キーフレームインデックスの保存ディレクトリ。Noneで無効。
+            background_jobs: キーフレームインデックスを作成するバックグラウンドジョブ実行環境。
+                             Noneの場合は動画を開く際に同期的に作成する。
+        """
+        self.max_open = max_open
+        self.idle_timeout_sec = idle_timeout_sec
+        self.frame_cache_bytes = frame_cache_bytes
+        self.keyframe_index_dir = keyframe_index_dir
+        self.background_jobs = background_jobs
+        self._lock = threading.Lock()
+        # 貸出中の数が max_open 未満になったことを待つための条件変数
+        self._available = threading.Condition(self._lock)
+        self._idle: List[_PooledProcessor] = []  # 先頭ほど古い（LRU順）
+        self._leased: Dict[PoolKey, int] = {}
+        self._caches: Dict[PoolKey, FrameCache] = {}
+        self._in_use = 0
+        # アイドル時間の超過を確認するタイマー（アイドルのインスタンスがない間はNone）
+        self._evict_timer: Optional[threading.Timer] = None
+        self._opened = 0
+        self._reused = 0
+
+    @staticmethod
+    def make_key(video_path: str) -> PoolKey:
+        """
+        動画ファイルのプールキーを生成
+
+        Args:
+            video_path: 動画ファイルのパス
+
+        Returns:
+            (絶対パス, 更新時刻[ns], ファイルサイズ) のタプル
+        """
+        abs_path = os.path.abspath(video_path)
+        stat = os.stat(abs_path)
+        return (abs_path, stat.st_mtime_ns, stat.st_size)
+
+    def frame_cache_for(self, video_path: str) -> Optional[FrameCache]:
+        """
+        動画のFrameCacheを取得（キャッシュ無効時はNone）
+
+        Args:
+            video_path: 動画ファイルのパス
+
+        Returns:
+            プール内のVideoProcessorと共有されるFrameCache
+        """
+        key = self.make_key(video_path)
+        with self._lock:
+            return self._cache_for_key(key)
+
+    def _cache_for_key(self, key: PoolKey) -> Optional[FrameCache]:
+        """キーに対応するFrameCacheを取得・生成（ロック内で呼ぶ）"""
+        if self.frame_cache_bytes <= 0:
+            return None
+        cache = self._caches.get(key)
+        if cache is None:
+            cache = FrameCache(self.frame_cache_bytes)
+            self._caches[key] = cache
+        return cache
+
+    @contextmanager
+    def lease(self, video_path: str, use_frame_cache: bool = True) -> Iterator[VideoProcessor]:
+        """
+        VideoProcessorを貸し出す
+
+        取得したVideoProcessorは close() せず、withブロックを抜けて返却すること。
+        VideoProcessor自体はスレッドセーフだが、貸し出し中のインスタンスは
+        他の貸し出しと共有しない（セッションごとの順次読み込みの位置を保つため）。
+        同じ動画のデコード済みフレームは、キーごとのFrameCacheで共有される。
+
+        Args:
+            video_path: 動画ファイルのパス
+            use_frame_cache: Falseの場合、貸し出し中はFrameCacheを読み書きしない
+                             （一括解析などでエディタのプレビュー用のフレームを追い出さないため）
+
+        Yields:
+            VideoProcessor
+        """
+        key = self.make_key(video_path)
+        entry = self._acquire(key)
+        frame_cache = entry.processor.frame_cache
+        if not use_frame_cache:
+            entry.processor.frame_cache = None
+        try:
+            yield entry.processor
+        finally:
+            entry.processor.frame_cache = frame_cache
+            self._release(entry)
+
+    def _acquire(self, key: PoolKey) -> _PooledProcessor:
+        """アイドルのインスタンスを取り出す（なければ新規に開く）。貸出数が上限なら返却を待つ"""
+        to_close: List[VideoProcessor] = []
+        with self._lock:
+            while self._in_use >= self.max_open:
+                self._available.wait()
+            self._in_use += 1
+            self._leased[key] = self._leased.get(key, 0) + 1
+            entry = None
+            for i in range(len(self._idle) - 1, -1, -1):
+                if self._idle[i].key == key:
+                    entry = self._idle.pop(i)
+                    self._reused += 1
+                    break
+            frame_cache = self._cache_for_key(key)
+            # アイドル時間・最大オープン数を超えたアイドルのインスタンスを閉じる
+            to_close.extend(self._collect_evictable())
+
+        for processor in to_close:
+            processor.close()
+
+        if entry is not None:
+            if entry.processor.keyframe_index is None:
+                # バックグラウンドで作成中だったインデックスが完了していれば設定する
+                entry.processor.keyframe_index = self._load_keyframe_index(key[0])
+            return entry
+
+        try:
+            processor = VideoProcessor(
+                key[0],
+                frame_cache=frame_cache,
+                keyframe_index=self._load_keyframe_index(key[0]),
+            )
+        except Exception:
+            with self._lock:
+                self._unlease(key)
+            raise
+
+        with self._lock:
+            self._opened += 1
+        return _PooledProcessor(key, processor)
+
+    def _load_keyframe_index(self, video_path: str) -> Optional[KeyframeIndex]:
+        """
+        キーフレームインデックスを読み込む（失敗時はNone）
+
+        background_jobs がある場合は作成をバックグラウンドに投入し、
+        完了していなければ待たずにNoneを返す。
+        """
+        if self.keyframe_index_dir is None:
+            return None
+        if self.background_jobs is not None:
+            try:
+                job_key = ("keyframes", self.make_key(video_path))
+            except OSError:
+                return None
+            index = self.background_jobs.result(job_key)
+            if index is None and not self.background_jobs.is_running(job_key):
+                self.background_jobs.submit(
+                    job_key, KeyframeIndex.load_or_build, video_path, self.keyframe_index_dir,
+                )
+            return index
+        try:
+            return KeyframeIndex.load_or_build(video_path, self.keyframe_index_dir)
+        except Exception as e:
+            logger.warning(f"Failed to load keyframe index for {video_path}: {e}")
+            return None
+
+    def _release(self, entry: _PooledProcessor):
+        """インスタンスを返却し、不要なものを閉じる"""
+        try:
+            stale = self.make_key(entry.key[0]) != entry.key
+        except OSError:
+            # 動画ファイルが削除された
+            stale = True
+
+        to_close: List[VideoProcessor] = []
+        with self._lock:
+            self._unlease(entry.key)
+            if stale:
+                to_close.append(entry.processor)
+                # 同じパスの古い世代も破棄する
+                to_close.extend(e.processor for e in self._idle if e.key[0] == entry.key[0])
+                self._idle = [e for e in self._idle if e.key[0] != entry.key[0]]
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            to_close.extend(self._collect_evictable())
+            self._schedule_eviction()
+
+        for processor in to_close:
+            processor.close()
+
+    def _schedule_eviction(self):
+        """最も古いアイドルのインスタンスの期限にアイドル時間の超過を確認するタイマーを設定（ロック内で呼ぶ）"""
+        if self._evict_timer is not None or not self._idle:
+            return
+        # 期限ちょうどでは超過と判定されないため、少し遅らせる
+        delay = self._idle[0].last_used + self.idle_timeout_sec - time.monotonic() + 0.1
+        self._evict_timer = threading.Timer(max(delay, 0.1), self._on_evict_timer)
+        self._evict_timer.daemon = True
+        self._evict_timer.start()
+
+    def _on_evict_timer(self):
+        """タイマーからアイドル時間を超過したインスタンスを閉じ、次のタイマーを設定"""
+        with self._lock:
+            self._evict_timer = None
+            to_close = self._collect_evictable()
+            self._schedule_eviction()
+        for processor in to_close:
+            processor.close()
+
+    def _unlease(self, key: PoolKey):
+        """貸出カウントを減らし、返却を待っている貸し出しに通知する（ロック内で呼ぶ）"""
+        self._in_use -= 1
+        self._available.notify()
+        count = self._leased.get(key, 0) - 1
+        if count > 0:
+            self._leased[key] = count
+        else:
+            self._leased.pop(key, None)
+
+    def _collect_evictable(self) -> List[VideoProcessor]:
+        """閉じるべきアイドルインスタンスをプールから外す（ロック内で呼ぶ）"""
+        now = time.monotonic()
+        evicted = [e for e in self._idle if now - e.last_used > self.idle_timeout_sec]
+        self._idle = [e for e in self._idle if now - e.last_used <= self.idle_timeout_sec]
+
+        while self._idle and len(self._idle) + self._in_use > self.max_open:
+            evicted.append(self._idle.pop(0))
+
+        # インスタンスが残っていない動画のキャッシュを破棄
+        live_keys = {e.key for e in self._idle} | set(self._leased)
+        for key in list(self._caches):
+            if key not in live_keys:
+                del self._caches[key]
+
+        return [e.processor for e in evicted]
+
+    def evict_idle(self) -> int:
+        """
+        アイドル時間を超過したインスタンスを閉じる
+
+        Returns:
+            閉じたインスタンス数
+        """
+        with self._lock:
+            to_close = self._collect_evictable()
+        for processor in to_close:
+            processor.close()
+        return len(to_close)
+
+    def close_all(self):
+        """アイドル中のインスタンスをすべて閉じる"""
+        with self._lock:
+            to_close = [e.processor for e in self._idle]
+            self._idle = []
+            self._caches = {k: c for k, c in self._caches.items() if k in self._leased}
+        for processor in to_close:
+            processor.close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        プールの統計情報を取得
+
+        Returns:
+            {'idle': アイドル数, 'in_use': 貸出中の数,
+             'opened': 累計オープン数, 'reused': 累計再利用数}
+        """
+        with self._lock:
+            return {
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'opened': self._opened,
+                'reused': self._reused,
+            }
@@ -4,22 +4,62 @@
 動画からのフレーム抽出、注釈描画（焼き込み）を行う。
 """
 
+import threading
+
 import cv2
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator
 
+from .coord_utils import polygons_to_pixels, rel_coords_to_pixels
+from .frame_cache import FrameCache
+from .keyframe_index import KeyframeIndex
+from .mp4_parser import parse_mp4_video_track
 
-class VideoProcessor:
-    """動画処理クラス"""
 
-    def __init__(self, video_path: str):
+class VideoProcessor:
+    """
+    動画処理クラス
+
+    スレッドセーフティ:
+        1つのインスタンスを複数のスレッド（Streamlitのセッションや先読みワーカー）
+        から同時に使ってよい。cv2.VideoCapture のシークと読み込み、現在位置の更新は
+        フレーム1枚ごとにインスタンスのロック（RLock）内で行うため、
+        別スレッドの読み込みが割り込んでも正しいフレームが返る。
+        extract_frames / iter_frames などの一括抽出は全体ではなくフレーム1枚ごとに
+        ロックを取るため、同時に使うと互いの読み進めを妨げてシークが増える
+        （結果は正しい）。順次読み込みの効率が必要な場合はインスタンスを分けること。
+        draw_* は入力フレームのみを扱うため、ロックを取らない。
+    """
+
+    # シークせずにgrab()で読み進めるフレーム間隔の上限
+    DEFAULT_MAX_GRAB_GAP = 60
+
+    # MP4/MOVで目的のフレームより手前に着地するまで、時刻を戻してシークし直す回数の上限
+    MAX_SEEK_ATTEMPTS = 4
+
+    def __init__(self, video_path: str, frame_cache: Optional[FrameCache] = None,
+                 max_grab_gap: int = DEFAULT_MAX_GRAB_GAP,
+                 keyframe_index: Optional[KeyframeIndex] = None):
         """
         初期化
 
         Args:
             video_path: 動画ファイルのパス
+            frame_cache: デコード済みフレームのキャッシュ（オプション）。
+                         指定した場合、抽出済みのフレームはデコードせずに返す。
+            max_grab_gap: 現在位置からこのフレーム数以内の前方フレームは
+                          シークせずgrab()で読み進める（keyframe_index未指定時）
+            keyframe_index: キーフレームインデックス（オプション）。指定した場合、
+                            GOP構造からシークと読み進めのどちらが速いかを判断する。
         """
         self.video_path = video_path
+        self.frame_cache = frame_cache
+        self.max_grab_gap = max_grab_gap
+        self.keyframe_index = keyframe_index
+        # シーク・読み込み・現在位置の更新を1つの操作として扱うためのロック
+        self._lock = threading.RLock()
+        # 次のread()で得られるフレーム番号（不明な場合はNone）
+        self._next_frame_index: Optional[int] = 0
         self.cap = cv2.VideoCapture(video_path)
         if not self.cap.isOpened():
             raise IOError(f"動画ファイル '{video_path}' が開けません。")
@@ -30,6 +70,19 @@ class VideoProcessor:
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
         self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
+        # MP4/MOVはサンプル表の表示順のサンプル番号をフレーム番号とし、正確なフレーム時刻で
+        # 時間との変換とシークを行う（可変フレームレート対策）
+        self.mp4_track = parse_mp4_video_track(video_path)
+        if self.mp4_track is not None:
+            self.fps = self.mp4_track.fps
+            self.total_frames = self.mp4_track.frame_count
+            self.duration_sec = self.mp4_track.duration_sec
+        elif self.fps > 0 and self.total_frames > 0:
+            self.duration_sec = self.total_frames / self.fps
+        else:
+            # 長さが不明（0の場合はフレーム番号の範囲を判定しない）
+            self.duration_sec = 0.0
+
     def get_video_info(self) -> Dict:
         """
         動画情報を取得
@@ -44,35 +97,310 @@ class VideoProcessor:
                 'duration_sec': 再生時間（秒）
             }
         """
-        duration_sec = self.total_frames / self.fps if self.fps > 0 else 0
         return {
             'width': self.width,
             'height': self.height,
             'fps': self.fps,
             'total_frames': self.total_frames,
-            'duration_sec': duration_sec
+            'duration_sec': self.duration_sec
         }
 
+    def frame_index_for_time(self, time_sec: float) -> int:
+        """
+        時間（秒）をフレーム番号に変換
+
+        MP4/MOVの場合はサンプル表のフレーム時刻を二分探索し、
+        time_sec の時点で表示されているフレームを返す。
+
+        Args:
+            time_sec: 時間（秒）
+
+        Returns:
+            フレーム番号。負の時間や動画の長さ以降の時間、
+            フレームレートが不明な場合は-1。
+        """
+        if self.mp4_track is not None:
+            return self.mp4_track.frame_index_for_time(time_sec)
+        if time_sec < 0 or self.fps <= 0:
+            return -1
+        if self.duration_sec > 0 and time_sec >= self.duration_sec:
+            return -1
+        return int(time_sec * self.fps)
+
+    def time_for_frame_index(self, frame_index: int) -> float:
+        """
+        フレーム番号を、そのフレームが表示される区間の中央の時間（秒）に変換
+
+        区間の中央を返すため、frame_index_for_time で同じフレーム番号に戻る。
+
+        Args:
+            frame_index: フレーム番号
+
+        Returns:
+            時間（秒）。フレームレートが不明な場合は0。
+        """
+        if self.mp4_track is not None:
+            times = self.mp4_track.frame_times
+            start = float(times[frame_index])
+            if frame_index + 1 < len(times):
+                end = float(times[frame_index + 1])
+            else:
+                end = self.mp4_track.duration_sec
+            return (start + end) / 2.0
+        if self.fps <= 0:
+            return 0.0
+        return (frame_index + 0.5) / self.fps
+
     def extract_frame(self, time_sec: float) -> Optional[np.ndarray]:
         """
         指定秒数のフレームを抽出
 
+        frame_cacheが設定されている場合、キャッシュ済みのフレームは
+        読み取り専用の配列として返す（描画する場合はコピーすること）。
+
+        Args:
+            time_sec: 抽出するフレームの時間（秒）
+
+        Returns:
+            フレーム画像（numpy配列）。失敗した場合はNone。
+        """
+        if self._seeks_by_time():
+            return self._read_frame_at_time(time_sec)
+        return self._read_frame_at(self.frame_index_for_time(time_sec))
+
+    def extract_frame_scaled(self, time_sec: float, max_height: int) -> Optional[np.ndarray]:
+        """
+        指定秒数のフレームを縮小して抽出
+
+        色変換やPIL画像への変換の前に cv2.INTER_AREA で縮小するため、
+        高解像度の動画でもプレビュー用の画像を安価に得られる。
+        元の高さが max_height 以下の場合は縮小しない。
+
         Args:
             time_sec: 抽出するフレームの時間（秒）
+            max_height: 縮小後の最大の高さ（ピクセル）
+
+        Returns:
+            フレーム画像（numpy配列、BGR）。失敗した場合はNone。
+        """
+        frame = self.extract_frame(time_sec)
+        if frame is None:
+            return None
+
+        height, width = frame.shape[:2]
+        if height <= max_height:
+            return frame
+
+        scaled_width = max(1, round(width * max_height / height))
+        return cv2.resize(frame, (scaled_width, max_height), interpolation=cv2.INTER_AREA)
+
+    def extract_frames(self, timestamps: Iterable[float]) -> List[Optional[np.ndarray]]:
+        """
+        複数の時間のフレームをまとめて抽出
+
+        フレーム番号順に並べ替えて読み進めるため、1件ずつ extract_frame を
+        呼ぶよりシーク回数が少ない。全フレームをメモリに保持するため、
+        大量のフレームを扱う場合は iter_frames を使用すること。
+
+        Args:
+            timestamps: 抽出するフレームの時間（秒）のリスト
+
+        Returns:
+            引数と同じ順序のフレーム画像リスト。失敗したフレームはNone。
+        """
+        timestamps = list(timestamps)
+        frames: List[Optional[np.ndarray]] = [None] * len(timestamps)
+        for i, frame in self.iter_frames(timestamps):
+            frames[i] = frame
+        return frames
+
+    def iter_frames(self, timestamps: Iterable[float]) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+        """
+        複数の時間のフレームをデコード順に抽出するジェネレータ
+
+        Args:
+            timestamps: 抽出するフレームの時間（秒）のリスト
+
+        Yields:
+            (引数内のインデックス, フレーム画像) のタプル。
+            フレーム番号の昇順で返す。失敗したフレームはNone。
+        """
+        if self._seeks_by_time():
+            return self._iter_frames_by_time(list(timestamps))
+        frame_indices = [self.frame_index_for_time(t) for t in timestamps]
+        return self.iter_frame_indices(frame_indices)
+
+    def _seeks_by_time(self) -> bool:
+        """フレームレートが不明で、フレーム番号を使えず時間でシークする必要があるか"""
+        return self.mp4_track is None and self.fps <= 0
+
+    def _iter_frames_by_time(self, timestamps: List[float]) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+        """時間の昇順に時間でシークして抽出するジェネレータ（フレームレートが不明な場合）"""
+        for i, time_sec in sorted(enumerate(timestamps), key=lambda item: item[1]):
+            yield i, self._read_frame_at_time(time_sec)
+
+    def _read_frame_at_time(self, time_sec: float) -> Optional[np.ndarray]:
+        """
+        時間（秒）でシークしてフレームを読み込む（フレームレートが不明な場合。キャッシュしない）
+
+        Args:
+            time_sec: 時間（秒）
 
         Returns:
             フレーム画像（numpy配列）。失敗した場合はNone。
         """
-        target_frame = int(time_sec * self.fps)
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
+        if time_sec < 0:
+            return None
+        with self._lock:
+            self._next_frame_index = None
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, time_sec * 1000.0)
+            ret, frame = self.cap.read()
+            return frame if ret else None
+
+    def iter_frame_indices(self, frame_indices: Iterable[int]) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+        """
+        複数のフレーム番号のフレームをデコード順に抽出するジェネレータ
+
+        フレーム番号を昇順に並べ替え、近い間隔はgrab()で読み進め、
+        離れた間隔のみシークする。同じフレーム番号は1回だけデコードする。
 
-        ret, frame = self.cap.read()
-        if not ret:
+        Args:
+            frame_indices: 抽出するフレーム番号のリスト
+
+        Yields:
+            (引数内のインデックス, フレーム画像) のタプル。
+            フレーム番号の昇順で返す。失敗したフレームはNone。
+        """
+        order = sorted(enumerate(frame_indices), key=lambda item: item[1])
+
+        last_index: Optional[int] = None
+        last_frame: Optional[np.ndarray] = None
+        for i, frame_index in order:
+            if frame_index != last_index:
+                last_frame = self._read_frame_at(frame_index)
+                last_index = frame_index
+            yield i, last_frame
+
+    def _read_frame_at(self, target_frame: int) -> Optional[np.ndarray]:
+        """
+        フレーム番号のフレームを読み込む
+
+        キャッシュにあればそれを返す。keyframe_indexがあればデコード枚数が
+        少ない方法を選び、なければ現在位置から max_grab_gap 以内の前方は
+        grab()で読み進め、それ以外はシークする。
+        MP4/MOVはフレーム時刻でシークし、着地したフレームの表示時刻から
+        サンプル番号を求めて目的のフレームまで読み進める。
+
+        Args:
+            target_frame: フレーム番号
+
+        Returns:
+            フレーム画像（numpy配列）。失敗した場合はNone。
+        """
+        if target_frame < 0:
             return None
-        return frame
+
+        if self.frame_cache is not None:
+            cached = self.frame_cache.get(target_frame)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            # ロック待ちの間に別スレッドが同じフレームを読み込んでいればそれを返す
+            if self.frame_cache is not None and target_frame in self.frame_cache:
+                cached = self.frame_cache.get(target_frame)
+                if cached is not None:
+                    return cached
+
+            position = self._next_frame_index
+            if self.keyframe_index is not None:
+                use_seek, _ = self.keyframe_index.decode_cost(position, target_frame)
+            else:
+                gap = target_frame - position if position is not None else -1
+                use_seek = not (0 <= gap <= self.max_grab_gap)
+
+            if not use_seek:
+                grabs = target_frame - position + 1
+            elif self.mp4_track is not None:
+                current = self._seek_to_sample(target_frame)
+                if current is None:
+                    self._next_frame_index = None
+                    return None
+                grabs = target_frame - current
+            else:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
+                grabs = 1
+
+            for _ in range(grabs):
+                if not self.cap.grab():
+                    self._next_frame_index = None
+                    return None
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                self._next_frame_index = None
+                return None
+            self._next_frame_index = target_frame + 1
+
+            if self.frame_cache is not None:
+                frame = self.frame_cache.put(target_frame, frame)
+            return frame
+
+    def _grabbed_sample_index(self) -> int:
+        """直前にgrab()したフレームのサンプル番号（表示時刻に最も近いフレーム時刻）"""
+        times = self.mp4_track.frame_times
+        time_sec = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        index = int(np.searchsorted(times, time_sec))
+        if index >= len(times) or (index > 0 and time_sec - times[index - 1] < times[index] - time_sec):
+            index -= 1
+        return index
+
+    def _seek_to_sample(self, target_frame: int) -> Optional[int]:
+        """
+        target_frame 以前のフレームにシークしてgrab()する（MP4/MOV、ロック内で呼ぶ）
+
+        OpenCVは時刻を平均fpsでフレーム番号に換算してシークするため、可変フレームレートでは
+        目的より後に着地することがある。その場合は手前の時刻からシークし直し、
+        それでも着地できなければ先頭から読み進める。
+
+        Args:
+            target_frame: フレーム番号（サンプル番号）
+
+        Returns:
+            grab()したフレームのサンプル番号（target_frame 以下）。失敗した場合はNone。
+        """
+        target_time = float(self.mp4_track.frame_times[target_frame])
+        back_sec = 0.0
+        for _ in range(self.MAX_SEEK_ATTEMPTS):
+            seek_time = max(0.0, target_time - back_sec)
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, seek_time * 1000.0)
+            if self.cap.grab():
+                current = self._grabbed_sample_index()
+                if current <= target_frame:
+                    return current
+            if seek_time <= 0.0:
+                break
+            back_sec = max(back_sec * 2, 1.0)
+
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return 0 if self.cap.grab() else None
+
+    @staticmethod
+    def _to_pixels(frame: np.ndarray, rel_coords_list) -> np.ndarray:
+        """(N, 4) の相対座標を frame のピクセル座標（int32、int()相当の切り捨て）に変換"""
+        height, width = frame.shape[:2]
+        return rel_coords_to_pixels(rel_coords_list, width, height,
+                                    rounding="trunc", check_range=False)
+
+    @staticmethod
+    def _to_polygon_pixels(frame: np.ndarray, polygons) -> List[np.ndarray]:
+        """多角形の相対座標の点列のリストを frame のピクセル座標に変換"""
+        height, width = frame.shape[:2]
+        return polygons_to_pixels(polygons, width, height,
+                                  rounding="trunc", check_range=False)
 
     def draw_rect(self, frame: np.ndarray, rel_coords: Tuple,
-                  color: Tuple = (0, 0, 255), thickness: int = 3) -> np.ndarray:
+                  color: Tuple = (0, 0, 255), thickness: int = 3,
+                  inplace: bool = False) -> np.ndarray:
         """
         相対座標で矩形を描画
 
@@ -81,23 +409,21 @@ class VideoProcessor:
             rel_coords: 相対座標 (rx1, ry1, rx2, ry2)
             color: 色（B, G, R）のタプル。デフォルトは赤 (0, 0, 255)
             thickness: 線の太さ。デフォルトは3
+            inplace: Trueの場合、コピーせずに frame に直接描画する
 
         Returns:
             矩形が描画されたフレーム画像
         """
-        rx1, ry1, rx2, ry2 = rel_coords
-        x1 = int(self.width * rx1)
-        y1 = int(self.height * ry1)
-        x2 = int(self.width * rx2)
-        y2 = int(self.height * ry2)
+        x1, y1, x2, y2 = self._to_pixels(frame, [rel_coords])[0].tolist()
 
         # フレームのコピーを作成（元のフレームを変更しないため）
-        frame_copy = frame.copy()
+        frame_copy = frame if inplace else frame.copy()
         cv2.rectangle(frame_copy, (x1, y1), (x2, y2), color, thickness)
         return frame_copy
 
     def draw_line(self, frame: np.ndarray, rel_coords: Tuple,
-                  color: Tuple = (0, 0, 255), thickness: int = 3) -> np.ndarray:
+                  color: Tuple = (0, 0, 255), thickness: int = 3,
+                  inplace: bool = False) -> np.ndarray:
         """
         相対座標で直線を描画（矢じりなし）
 
@@ -106,23 +432,21 @@ class VideoProcessor:
             rel_coords: 相対座標 (rx1, ry1, rx2, ry2) - 始点から終点へ
             color: 色（B, G, R）のタプル。デフォルトは赤 (0, 0, 255)
             thickness: 線の太さ。デフォルトは3
+            inplace: Trueの場合、コピーせずに frame に直接描画する
 
         Returns:
             直線が描画されたフレーム画像
         """
-        rx1, ry1, rx2, ry2 = rel_coords
-        x1 = int(self.width * rx1)
-        y1 = int(self.height * ry1)
-        x2 = int(self.width * rx2)
-        y2 = int(self.height * ry2)
+        x1, y1, x2, y2 = self._to_pixels(frame, [rel_coords])[0].tolist()
 
-        frame_copy = frame.copy()
+        frame_copy = frame if inplace else frame.copy()
         cv2.line(frame_copy, (x1, y1), (x2, y2), color, thickness,
                  lineType=cv2.LINE_AA)
         return frame_copy
 
     def draw_arrow(self, frame: np.ndarray, rel_coords: Tuple,
-                   color: Tuple = (0, 0, 255), thickness: int = 4) -> np.ndarray:
+                   color: Tuple = (0, 0, 255), thickness: int = 4,
+                   inplace: bool = False) -> np.ndarray:
         """
         相対座標で矢印を描画
 
@@ -131,60 +455,133 @@ class VideoProcessor:
             rel_coords: 相対座標 (rx1, ry1, rx2, ry2) - 始点から終点へ
             color: 色（B, G, R）のタプル。デフォルトは赤 (0, 0, 255)
             thickness: 線の太さ。デフォルトは4
+            inplace: Trueの場合、コピーせずに frame に直接描画する
 
         Returns:
             矢印が描画されたフレーム画像
         """
-        rx1, ry1, rx2, ry2 = rel_coords
-        x1 = int(self.width * rx1)
-        y1 = int(self.height * ry1)
-        x2 = int(self.width * rx2)
-        y2 = int(self.height * ry2)
+        x1, y1, x2, y2 = self._to_pixels(frame, [rel_coords])[0].tolist()
 
         # フレームのコピーを作成（元のフレームを変更しないため）
-        frame_copy = frame.copy()
+        frame_copy = frame if inplace else frame.copy()
         # tipLengthは矢印の先端の大きさを調整します
         cv2.arrowedLine(frame_copy, (x1, y1), (x2, y2), color, thickness,
                        line_type=cv2.LINE_AA, tipLength=0.3)
         return frame_copy
 
-    def draw_annotations(self, frame: np.ndarray, annotations: List[Dict]) -> np.ndarray:
+    def draw_polygon(self, frame: np.ndarray, rel_points,
+                     color: Tuple = (0, 0, 255), thickness: int = 3,
+                     inplace: bool = False) -> np.ndarray:
+        """
+        相対座標で多角形（閉じた折れ線）を描画
+
+        Args:
+            frame: フレーム画像（numpy配列）
+            rel_points: 相対座標の点列 [[rx1, ry1], [rx2, ry2], ...]（3点以上）
+            color: 色（B, G, R）のタプル。デフォルトは赤 (0, 0, 255)
+            thickness: 線の太さ。デフォルトは3
+            inplace: Trueの場合、コピーせずに frame に直接描画する
+
+        Returns:
+            多角形が描画されたフレーム画像
+        """
+        frame_copy = frame if inplace else frame.copy()
+        cv2.polylines(frame_copy, self._to_polygon_pixels(frame, [rel_points]), True, color, thickness,
+                      lineType=cv2.LINE_AA)
+        return frame_copy
+
+    def draw_annotations(self, frame: np.ndarray, annotations: List[Dict],
+                         out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         複数の注釈を描画
 
+        フレームのコピーは最大1回で、各注釈は同じバッファに直接描画する。
+        相対座標からピクセル座標への変換は rect/line/arrow と polygon ごとに一括で行う。
+        座標は frame のサイズを基準に変換するため、縮小したフレームにも描画できる。
+        out に呼び出し側のバッファを渡すと、新しい配列を確保せずにそこへ描画する。
+        注釈はリストの順に重ねて描画する（連続する同じ色・線幅の polygon は
+        1回の cv2.polylines にまとめる）。
+
         Args:
             frame: フレーム画像（numpy配列）
             annotations: 注釈リスト。各注釈は以下の形式：
                 {
-                    'type': 'rect', 'line', または 'arrow',
-                    'rel_coords': (rx1, ry1, rx2, ry2),
+                    'type': 'rect', 'line', 'arrow', または 'polygon',
+                    'rel_coords': (rx1, ry1, rx2, ry2),  # polygonは [[rx, ry], ...]
                     'color': (B, G, R),  # オプション、デフォルトは赤
                     'thickness': int     # オプション、デフォルトは3（rect/line）または4（arrow）
                 }
+            out: 描画先のバッファ（オプション、frame と同じ形状・型）。
+                 frame 自身を渡すとコピーせずに frame へ直接描画する（書き込み可能であること）。
+                 省略時は frame のコピーを1回作成する。
 
         Returns:
-            すべての注釈が描画されたフレーム画像
+            すべての注釈が描画されたフレーム画像（out を指定した場合は out）
         """
-        result_frame = frame.copy()
+        if out is None:
+            result_frame = frame.copy()
+        else:
+            if out.shape != frame.shape or out.dtype != frame.dtype:
+                raise ValueError("out は frame と同じ形状・型である必要があります。")
+            if not out.flags.writeable:
+                raise ValueError("out は書き込み可能な配列である必要があります。")
+            if out is not frame:
+                np.copyto(out, frame)
+            result_frame = out
+
+        # 座標変換は種類ごとに全注釈分をまとめて行う
+        segments = []
+        polygons = []
+        for annotation in annotations:
+            if annotation['type'] in ('rect', 'line', 'arrow'):
+                segments.append(annotation['rel_coords'])
+            elif annotation['type'] == 'polygon':
+                polygons.append(annotation['rel_coords'])
+        segment_coords = iter(self._to_pixels(result_frame, segments).tolist() if segments else [])
+        polygon_points = iter(self._to_polygon_pixels(result_frame, polygons) if polygons else [])
+
+        # 描画待ちの連続する polygon（色, 線幅, 点列のリスト）
+        pending_polygons: Optional[Tuple[Tuple, int, List[np.ndarray]]] = None
+
+        def flush_polygons():
+            nonlocal pending_polygons
+            if pending_polygons is not None:
+                color, thickness, group = pending_polygons
+                cv2.polylines(result_frame, group, True, color, thickness, lineType=cv2.LINE_AA)
+                pending_polygons = None
 
         for annotation in annotations:
-            if annotation['type'] == 'rect':
-                color = annotation.get('color', (0, 0, 255))
+            annotation_type = annotation['type']
+            color = annotation.get('color', (0, 0, 255))
+            if annotation_type == 'polygon':
+                color = tuple(color)
+                thickness = annotation.get('thickness', 3)
+                points = next(polygon_points)
+                if pending_polygons is not None and pending_polygons[:2] == (color, thickness):
+                    pending_polygons[2].append(points)
+                else:
+                    flush_polygons()
+                    pending_polygons = (color, thickness, [points])
+                continue
+
+            flush_polygons()
+            if annotation_type == 'rect':
+                x1, y1, x2, y2 = next(segment_coords)
                 thickness = annotation.get('thickness', 3)
-                result_frame = self.draw_rect(result_frame, annotation['rel_coords'],
-                                             color, thickness)
-            elif annotation['type'] == 'line':
-                color = annotation.get('color', (0, 0, 255))
+                cv2.rectangle(result_frame, (x1, y1), (x2, y2), color, thickness)
+            elif annotation_type == 'line':
+                x1, y1, x2, y2 = next(segment_coords)
                 thickness = annotation.get('thickness', 3)
-                result_frame = self.draw_line(result_frame, annotation['rel_coords'],
-                                             color, thickness)
-            elif annotation['type'] == 'arrow':
-                color = annotation.get('color', (0, 0, 255))
+                cv2.line(result_frame, (x1, y1), (x2, y2), color, thickness,
+                         lineType=cv2.LINE_AA)
+            elif annotation_type == 'arrow':
+                x1, y1, x2, y2 = next(segment_coords)
                 thickness = annotation.get('thickness', 4)
-                result_frame = self.draw_arrow(result_frame, annotation['rel_coords'],
-                                              color, thickness)
+                cv2.arrowedLine(result_frame, (x1, y1), (x2, y2), color, thickness,
+                                line_type=cv2.LINE_AA, tipLength=0.3)
             else:
-                print(f"Warning: 不明な注釈タイプ '{annotation['type']}' はスキップされます。")
+                print(f"Warning: 不明な注釈タイプ '{annotation_type}' はスキップされます。")
+        flush_polygons()
 
         return result_frame
 
@@ -206,8 +603,9 @@ class VideoProcessor:
 
     def close(self):
         """リソースを解放"""
-        if self.cap.isOpened():
-            self.cap.release()
+        with self._lock:
+            if self.cap.isOpened():
+                self.cap.release()
 
     def __enter__(self):
         """コンテキストマネージャーのエントリ"""